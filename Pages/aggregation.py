@@ -0,0 +1,95 @@
+import numpy as np
+import streamlit as st
+from Pages.snapshot import dataset_key, load_combined_data
+from Pages.candidates import candidate_labels, load_candidate_table
+from Pages.metrics import measure, timed
+
+# Compteurs additifs agrégés à chaque niveau du cube
+COUNTERS = ['Inscrits', 'Votants', 'Abstentions', 'Blancs', 'Nuls', 'Exprimés']
+
+# Clés de regroupement de chaque niveau (chaque département appartient à une seule région)
+DEPARTMENT_KEYS = ['code_departement', 'nom_departement']
+REGION_KEYS = ['code_region', 'nom_region']
+
+# Colonnes du DataFrame fusionné nécessaires à la construction du cube
+CUBE_COLUMNS = COUNTERS + DEPARTMENT_KEYS + REGION_KEYS
+
+
+def candidate_matrix(df_long, n_rows, n_candidates):
+    """
+    Retourne la matrice (ligne x candidat) des voix à partir de la table longue, en un seul bincount.
+    """
+    keys = df_long['commune_id'].to_numpy().astype(np.int64) * n_candidates + df_long['candidate_id'].to_numpy()
+    totals = np.bincount(keys, weights=df_long['votes'].to_numpy(), minlength=n_rows * n_candidates)
+    return totals.reshape(n_rows, n_candidates).astype(np.int64)
+
+
+def build_cube(df, df_long, candidates):
+    """
+    Construit le cube des compteurs sommés (compteurs de participation, voix totales et voix par candidat)
+    aux niveaux commune, département, région et national, ainsi que la liste des colonnes de candidats.
+    Chaque niveau est obtenu par agrégation du niveau inférieur : commune -> département -> région.
+    Les colonnes des candidats sont nommées par `candidate_labels` (nom, ou prénom et nom si le nom est partagé).
+    """
+    candidate_names = candidate_labels(candidates)
+    votes = candidate_matrix(df_long, len(df), len(candidates))
+
+    # Niveau commune : une ligne par ligne de df, compteurs en entiers 64 bits pour des sommes exactes
+    df_commune = df[DEPARTMENT_KEYS + REGION_KEYS].copy()
+    for column in COUNTERS:
+        df_commune[column] = df[column].fillna(0).to_numpy().astype(np.int64)
+    df_commune['Voix'] = votes.sum(axis=1)
+    df_commune[candidate_names] = votes
+
+    return rollup(df_commune, candidate_names)
+
+
+def rollup(df_commune, candidate_names):
+    """
+    Construit les niveaux département, région et national à partir du niveau commune du cube
+    (ou d'une sélection de ses lignes, ex : les communes retenues par les filtres).
+    """
+    measures = COUNTERS + ['Voix'] + candidate_names
+
+    # Niveau département : un seul groupby sur toutes les mesures (la région est une clé redondante du département)
+    with measure("groupby.departement"):
+        df_departement = df_commune.groupby(DEPARTMENT_KEYS + REGION_KEYS, as_index=False, observed=True)[measures].sum()
+
+    # Niveau région : cumul des départements, sans repasser par les communes
+    with measure("groupby.region"):
+        df_region = df_departement.groupby(REGION_KEYS, as_index=False, observed=True)[measures].sum()
+
+    # Les clés catégorielles sont converties en valeurs simples : les graphiques n'affichent ainsi que les groupes présents
+    for table in (df_departement, df_region):
+        for column in table.columns.intersection(DEPARTMENT_KEYS + REGION_KEYS):
+            table[column] = table[column].astype(object)
+
+    return {
+        'commune': df_commune,
+        'departement': df_departement,
+        'region': df_region,
+        'national': df_commune[measures].sum(),
+        'candidats': candidate_names,
+    }
+
+
+def turnout(table):
+    """
+    Taux de participation (%) calculé à partir des compteurs sommés, et non comme moyenne des taux communaux.
+    """
+    return table['Votants'] / table['Inscrits'] * 100
+
+
+@st.cache_resource(show_spinner="Agrégation des résultats...")
+def _load_cube(key, presidentielle_path, commune_path):
+    df = load_combined_data(presidentielle_path, commune_path, columns=CUBE_COLUMNS)
+    df_long, candidates = load_candidate_table(presidentielle_path, commune_path)
+    return build_cube(df, df_long, candidates)
+
+
+@timed("load_cube")
+def load_cube(presidentielle_path, commune_path):
+    """
+    Retourne le cube d'agrégats, partagé entre les sessions et reconstruit uniquement si les données changent.
+    """
+    return _load_cube(dataset_key(presidentielle_path, commune_path), presidentielle_path, commune_path)
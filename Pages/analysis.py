@@ -1,83 +1,31 @@
 import streamlit as st
 import pandas as pd
-
-def load_raw_commune_data(commune_path):
-    """
-    Charge le fichier CSV brut des données communales et le retourne sous forme de DataFrame.
-    """
-    df_communes = pd.read_csv(commune_path)  # Charger les données du fichier CSV des communes
-    return df_communes
-
+from Pages.ingestion import load_clean_data, load_commune_index, load_elections
+from Pages.geo import unmatched_codes
+from Pages.registry import COMMUNE_PATH, DEFAULT_ELECTION, ELECTIONS
+from Pages.aggregation import load_cube
+from Pages.schema import memory_report, total_memory
+from Pages.metrics import measure, timed
+
+@timed("load_and_clean_data")
 def load_and_clean_data(presidentielle_path, commune_path):
     """
     Charge et nettoie les données des fichiers CSV/XLS des élections présidentielles et des communes.
     Retourne les DataFrames nettoyés et fusionnés.
+    Les données sont mises en cache selon le chemin, la date de modification et la taille des fichiers :
+    une seule copie en lecture seule est partagée par toutes les sessions, rien n'est copié dans l'état des sessions.
     """
+    return load_clean_data(presidentielle_path, commune_path)
 
-    # Charger le fichier Excel des résultats de la présidentielle sans ignorer les lignes
-    df_presidentielle_brut = pd.read_excel(presidentielle_path, engine='xlrd')  # Sans 'skiprows'
-    
-    # Charger les données avec 'skiprows' pour ignorer les 3 premières lignes
-    df_presidentielle = pd.read_excel(presidentielle_path, engine='xlrd', skiprows=3)
-
-    # Charger les données brutes des communes
-    df_communes = load_raw_commune_data(commune_path)
-
-    # Sélectionner les colonnes pertinentes dans le dataset présidentiel
-    columns_to_keep = [
-        'Code du département', 'Libellé du département', 'Code de la commune', 'Libellé de la commune',
-        'Inscrits', 'Abstentions', 'Votants', 'Blancs', 'Nuls', 'Exprimés'
-    ]
-
-    # Ajouter les colonnes pour les noms, prénoms et voix des candidats
-    for i in range(11):  # Boucle pour gérer les colonnes de plusieurs candidats
-        if i == 0:
-            columns_to_keep.extend([f'Nom', f'Prénom', f'Voix'])
-        else:
-            columns_to_keep.extend([f'Nom.{i}', f'Prénom.{i}', f'Voix.{i}'])
-
-    # Nettoyer le dataset présidentiel en sélectionnant uniquement les colonnes pertinentes
-    df_presidentielle_clean = df_presidentielle[columns_to_keep].copy()
-
-    # Convertir les codes de département et commune en chaînes de caractères et créer un code combiné unique
-    df_presidentielle_clean['Code du département'] = df_presidentielle_clean['Code du département'].astype(str)
-    df_presidentielle_clean['Code de la commune'] = df_presidentielle_clean['Code de la commune'].astype(str)
-    df_presidentielle_clean['code_commune_combined'] = df_presidentielle_clean['Code du département'] + df_presidentielle_clean['Code de la commune'].str.zfill(3)
-
-    # Nettoyer les données des communes en sélectionnant les colonnes pertinentes
-    columns_to_keep_communes = [
-        'code_commune_INSEE', 'nom_commune_postal', 'code_postal', 
-        'latitude', 'longitude', 'code_commune', 'nom_commune_complet', 
-        'code_departement', 'nom_departement', 'code_region', 'nom_region'
-    ]
-    df_communes_clean = df_communes[columns_to_keep_communes].copy()
-    df_communes_clean['code_commune_INSEE'] = df_communes_clean['code_commune_INSEE'].astype(str)
-
-    # Fusionner les deux datasets (présidentiel et communes) sur les codes INSEE et combiné
-    df_combined = pd.merge(
-        df_presidentielle_clean, 
-        df_communes_clean, 
-        left_on='code_commune_combined', 
-        right_on='code_commune_INSEE', 
-        how='left'  # Jointure gauche pour conserver toutes les données présidentielles
-    )
-
-    # Stocker les datasets nettoyés et fusionnés dans l'état de la session Streamlit
-    st.session_state['df_presidentielle_clean'] = df_presidentielle_clean
-    st.session_state['df_communes_clean'] = df_communes_clean
-    st.session_state['df'] = df_combined
-    
-    return df_presidentielle_brut, df_presidentielle_clean, df_communes_clean, df_combined
-
-def show_analysis():
+def show_analysis(election=DEFAULT_ELECTION):
     """
-    Affiche la page d'analyse sur Streamlit, incluant les datasets bruts, nettoyés et fusionnés.
+    Affiche la page d'analyse sur Streamlit, incluant les datasets bruts, nettoyés et fusionnés de l'élection choisie.
     """
     st.title("Page d'Analyse 📊")
 
-    # Chemins vers les fichiers de données
-    presidentielle_path = "./Presidentielle_2017_Resultats_Communes_Tour_1_c.xls"
-    commune_path = "./communes-departement-region.csv"
+    # Chemins vers les fichiers de données (registre des élections)
+    presidentielle_path = ELECTIONS[election]['path']
+    commune_path = COMMUNE_PATH
 
     # Afficher les datasets bruts avant le nettoyage
     st.header("Données Brutes et Après Nettoyage")
@@ -86,31 +34,90 @@ def show_analysis():
     df_presidentielle_brut, df_presidentielle_clean, df_communes_clean, df_combined = load_and_clean_data(presidentielle_path, commune_path)
 
     # Afficher les premières lignes du dataset présidentiel brut (sans skiprows)
-    st.subheader("Données Brutes des Élections Présidentielles (Sans Ignorer les 3 premières lignes)")
+    st.subheader("Données Brutes des Élections Présidentielles (Sans Ignorer les premières lignes)")
     st.write(df_presidentielle_brut.head(10))
+    show_memory_report(df_presidentielle_brut)
 
     # Afficher les premières lignes du dataset présidentiel après 'skiprows'
-    st.subheader("Données des Élections Présidentielles (Après Ignorance des 3 premières lignes)")
+    st.subheader("Données des Élections Présidentielles (Après Ignorance des premières lignes)")
     st.write(df_presidentielle_clean.head(10))
+    show_memory_report(df_presidentielle_clean)
 
     # Afficher les premières lignes du dataset des communes brut
     st.subheader("Données Brutes des Communes (10 premières lignes)")
     st.write(df_communes_clean.head(10))
+    show_memory_report(df_communes_clean)
 
     # Afficher les premières lignes du dataset fusionné
     st.subheader("Données Fusionnées (10 premières lignes)")
     st.write(df_combined.head(10))
+    show_memory_report(df_combined)
+
+    # Communes des résultats sans correspondance dans l'index de référence des communes (ex : outre-mer)
+    st.subheader("Communes Sans Correspondance Géographique")
+    show_unmatched_communes(df_presidentielle_clean, commune_path)
 
     # Vérification de l'agrégation des votes par département
     st.header("Vérification de l'Agrégation des Votes par Département")
-    verify_aggregation(df_combined)
+    verify_aggregation(load_cube(presidentielle_path, commune_path))
+
+    # Comparaison des élections dont les fichiers de résultats sont présents : chargées (en parallèle) uniquement à la demande
+    st.header("Comparaison des Élections Disponibles")
+    if st.checkbox("Charger et comparer toutes les élections disponibles"):
+        compare_elections(*load_elections())
+
+def show_unmatched_communes(df_presidentielle_clean, commune_path):
+    """
+    Affiche le nombre de codes commune sans correspondance dans l'index des communes, par département.
+    """
+    codes, df_unmatched_by_department = unmatched_by_department(df_presidentielle_clean, load_commune_index(commune_path))
+    st.write(f"{len(codes)} codes commune sans correspondance géographique.")
+    if len(codes):
+        st.write(df_unmatched_by_department)
+
+def unmatched_by_department(df_presidentielle_clean, commune_index):
+    """
+    Retourne les codes commune sans correspondance dans l'index des communes et leur nombre par département.
+    """
+    codes = unmatched_codes(commune_index, df_presidentielle_clean['code_commune_combined'])
+    df_unmatched = df_presidentielle_clean[df_presidentielle_clean['code_commune_combined'].isin(codes)]
+    with measure("groupby.unmatched_communes"):
+        df_unmatched_by_department = df_unmatched.groupby(['Code du département', 'Libellé du département'], observed=True).size()
+    return codes, df_unmatched_by_department.rename('Communes').reset_index()
+
+def show_memory_report(df):
+    """
+    Affiche, dans un bloc repliable, l'occupation mémoire totale du DataFrame et celle de chacune de ses colonnes.
+    """
+    with st.expander(f"Mémoire par colonne ({total_memory(df):.1f} Mo, {len(df)} lignes)"):
+        st.dataframe(memory_report(df))
+
+def compare_elections(elections, errors=None):
+    """
+    Affiche les totaux nationaux (inscrits, votants, exprimés) et le taux de participation de chaque élection,
+    ainsi que les élections qui n'ont pas pu être chargées.
+    """
+    for key, error in (errors or {}).items():
+        st.error(f"{ELECTIONS[key]['label']} : chargement impossible ({error})")
+    if elections:
+        st.write(election_comparison(elections))
+
+def election_comparison(elections):
+    """
+    Retourne les totaux nationaux (inscrits, votants, exprimés) et le taux de participation de chaque élection.
+    """
+    df_comparison = pd.DataFrame({
+        ELECTIONS[key]['label']: data[3][['Inscrits', 'Votants', 'Exprimés']].sum() for key, data in elections.items()
+    }).T
+    df_comparison['Taux de participation (%)'] = df_comparison['Votants'] / df_comparison['Inscrits'] * 100
+    return df_comparison
 
-def verify_aggregation(df_combined):
+def verify_aggregation(cube):
     """
-    Agrège les votes par département et affiche les 10 départements avec le plus de voix.
+    Affiche les 10 départements avec le plus de voix (tous candidats), à partir du cube d'agrégats.
     """
-    # Agréger les votes par département
-    df_agg = df_combined.groupby('Code du département')['Voix'].sum().reset_index()
+    # Les votes sont déjà agrégés par département dans le cube
+    df_agg = cube['departement'][['code_departement', 'nom_departement', 'Voix']]
 
     # Trier les départements par le nombre de voix et afficher les 10 premiers
     df_top_departments = df_agg.sort_values(by='Voix', ascending=False).head(10)
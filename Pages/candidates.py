@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from Pages.snapshot import dataset_key, load_combined_data
+from Pages.registry import election_for_path
+from Pages.metrics import timed
+
+
+def candidate_columns(slots):
+    """
+    Retourne les triplets de colonnes (Nom, Prénom, Voix) de chaque candidat dans le format large.
+    """
+    return [
+        ('Nom', 'Prénom', 'Voix') if i == 0 else (f'Nom.{i}', f'Prénom.{i}', f'Voix.{i}')
+        for i in range(slots)
+    ]
+
+
+def _shared_codes(columns):
+    """
+    Retourne les codes (commune x colonne, aplatis ligne par ligne, -1 pour une valeur manquante) des colonnes
+    catégorielles `columns` dans un dictionnaire commun, ainsi que ce dictionnaire (union de leurs catégories).
+    """
+    columns = [column.astype('category') for column in columns]
+    categories = pd.Index(np.concatenate([column.cat.categories.to_numpy(dtype=object) for column in columns])).unique()
+    codes = []
+    for column in columns:
+        # La dernière case de la table de correspondance traduit le code -1 (valeur manquante)
+        mapping = np.append(categories.get_indexer(column.cat.categories), -1)
+        codes.append(mapping[column.cat.codes.to_numpy()])
+    return np.column_stack(codes).ravel(), categories
+
+
+def build_candidate_table(df, slots=None):
+    """
+    Transforme les triplets larges (Nom, Prénom, Voix) en une table longue (commune_id, candidate_id, votes).
+    `commune_id` est la position de la ligne dans `df` et `candidate_id` renvoie au dictionnaire des candidats.
+    Sans `slots`, tous les triplets présents dans `df` ('Nom', 'Nom.1', ...) sont utilisés.
+    Retourne la table longue et le dictionnaire des candidats (indexé par candidate_id, colonnes Nom et Prénom).
+    """
+    if slots is None:
+        slots = sum(1 for column in df.columns if column == 'Nom' or str(column).startswith('Nom.'))
+    triplets = candidate_columns(slots)
+
+    # Codes des noms et prénoms dans un dictionnaire commun à toutes les colonnes (union des catégories),
+    # sans copie des libellés : seules les catégories (une par candidat) sont manipulées
+    noms, nom_categories = _shared_codes([df[nom] for nom, _, _ in triplets])
+    prenoms, prenom_categories = _shared_codes([df[prenom] for _, prenom, _ in triplets])
+
+    # Empilement vectorisé des colonnes : une ligne par (commune, candidat), dans l'ordre des communes
+    votes = np.column_stack([df[voix].to_numpy() for _, _, voix in triplets]).ravel()
+    commune_ids = np.repeat(np.arange(len(df), dtype=np.int32), len(triplets))
+
+    # Les cases vides (commune sans candidat à cette position) sont ignorées
+    present = noms >= 0
+    noms, prenoms, votes, commune_ids = noms[present], prenoms[present], votes[present], commune_ids[present]
+
+    # Dictionnaire des candidats : chaque couple (code du nom, code du prénom) reçoit un identifiant entier
+    # (le prénom manquant, code -1, est décalé à 0)
+    pair_keys = noms.astype(np.int64) * (len(prenom_categories) + 1) + (prenoms + 1)
+    candidate_ids, unique_keys = pd.factorize(pair_keys)
+    unique_prenoms = unique_keys % (len(prenom_categories) + 1) - 1
+    candidates = pd.DataFrame({
+        'Nom': nom_categories.take(unique_keys // (len(prenom_categories) + 1)),
+        'Prénom': prenom_categories.take(unique_prenoms, allow_fill=True, fill_value=np.nan),
+    })
+    candidates.index.name = 'candidate_id'
+
+    df_long = pd.DataFrame({
+        'commune_id': commune_ids,
+        'candidate_id': candidate_ids.astype(np.int16),
+        'votes': np.nan_to_num(votes.astype(np.float64)).astype(np.int32),
+    })
+    return df_long, candidates
+
+
+def candidate_labels(candidates):
+    """
+    Retourne le libellé de chaque candidat du dictionnaire (dans l'ordre des candidate_id) : son nom,
+    précédé de son prénom lorsque plusieurs candidats portent le même nom.
+    Les libellés servent de noms de colonnes au cube et doivent donc être uniques.
+    """
+    shared = candidates['Nom'].duplicated(keep=False)
+    labels = candidates['Nom'].astype(object).where(
+        ~shared, candidates['Prénom'].fillna('').astype(str).str.cat(candidates['Nom'].astype(str), sep=' ').str.strip()
+    )
+    if labels.duplicated().any():
+        raise ValueError(f"Libellés de candidats en double : {sorted(labels[labels.duplicated()].unique())}")
+    return labels.tolist()
+
+
+@st.cache_resource(show_spinner="Préparation de la table des candidats...")
+def _load_candidate_table(key, presidentielle_path, commune_path):
+    columns = [column for triplet in candidate_columns(election_for_path(presidentielle_path)['candidate_slots']) for column in triplet]
+    df = load_combined_data(presidentielle_path, commune_path, columns=columns)
+    return build_candidate_table(df)
+
+
+@timed("load_candidate_table")
+def load_candidate_table(presidentielle_path, commune_path):
+    """
+    Retourne la table longue des voix et le dictionnaire des candidats, alignés sur les lignes de `load_combined_data`.
+    Le résultat est partagé entre les sessions et recalculé uniquement si les données changent.
+    """
+    return _load_candidate_table(dataset_key(presidentielle_path, commune_path), presidentielle_path, commune_path)
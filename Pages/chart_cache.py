@@ -0,0 +1,112 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+import matplotlib
+import matplotlib.pyplot as plt
+import folium
+from Pages.static_export import read_artifact
+
+# Taille totale maximale des images et cartes conservées (en octets) ; au-delà, les moins récemment utilisées sont supprimées.
+# La borne porte sur la taille et non sur le nombre d'entrées : le HTML d'une carte pèse plusieurs Mo, une image quelques centaines de Ko
+CHART_CACHE_BYTES = 64 * 2 ** 20
+
+# Options d'export identiques à celles de st.pyplot
+SAVEFIG_OPTIONS = {'bbox_inches': 'tight', 'dpi': 200}
+
+# Version du rendu des graphiques et des cartes : à incrémenter à chaque modification d'une fonction build_* ou de leurs réglages,
+# pour que les images et cartes précalculées par une version précédente (build.py) ne soient plus servies
+RENDER_VERSION = 1
+
+# Cache partagé par toutes les sessions du processus : clé -> octets de l'image ou HTML de la carte
+_charts = OrderedDict()
+_charts_bytes = 0
+_charts_lock = threading.Lock()
+
+
+def render_version():
+    """
+    Retourne l'identifiant du code de rendu : RENDER_VERSION, options d'export et versions de matplotlib et folium.
+    Il fait partie de l'empreinte des graphiques, de sorte qu'un changement du rendu invalide les graphiques précalculés.
+    """
+    return (RENDER_VERSION, sorted(SAVEFIG_OPTIONS.items()), matplotlib.__version__, folium.__version__)
+
+
+def chart_key(fingerprint, name, **params):
+    """
+    Construit la clé de cache d'un graphique à partir de l'empreinte des données, du nom du graphique et de ses paramètres.
+    """
+    parts = (fingerprint, name, sorted(params.items()))
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def figure_to_bytes(fig, fmt='png'):
+    """
+    Exporte une figure matplotlib en octets (PNG ou SVG) puis la libère.
+    """
+    buffer = io.BytesIO()
+    try:
+        fig.savefig(buffer, format=fmt, **SAVEFIG_OPTIONS)
+    finally:
+        plt.close(fig)
+    return buffer.getvalue()
+
+
+def map_to_html(folium_map):
+    """
+    Convertit une carte folium en page HTML autonome, comme le fait folium_static.
+    """
+    return folium.Figure().add_child(folium_map).render()
+
+
+def _cached_render(key, render):
+    global _charts_bytes
+    with _charts_lock:
+        if key in _charts:
+            _charts.move_to_end(key)
+            return _charts[key]
+
+    rendered = render()
+
+    with _charts_lock:
+        # Taille d'une image : ses octets ; d'une carte : ses caractères (HTML presque entièrement ASCII)
+        if key in _charts:
+            _charts_bytes -= len(_charts[key])
+        _charts[key] = rendered
+        _charts.move_to_end(key)
+        _charts_bytes += len(rendered)
+        # L'entrée la plus récente est toujours conservée, même si elle dépasse à elle seule la borne
+        while _charts_bytes > CHART_CACHE_BYTES and len(_charts) > 1:
+            _charts_bytes -= len(_charts.popitem(last=False)[1])
+    return rendered
+
+
+def render_chart(key, build_figure, *args, fmt='png', **kwargs):
+    """
+    Retourne l'image du graphique identifié par `key`.
+    La figure n'est construite (build_figure(*args, **kwargs)) que si l'image n'est ni en cache ni précalculée (build.py).
+    Les graphiques sont des matplotlib.figure.Figure créées hors de pyplot : une figure dont la construction
+    échoue n'est référencée par aucun registre et est libérée avec l'exception.
+    """
+    return _cached_render(key, lambda: read_artifact(key) or figure_to_bytes(build_figure(*args, **kwargs), fmt))
+
+
+def render_map(key, build_map, *args, **kwargs):
+    """
+    Retourne le HTML de la carte identifiée par `key`.
+    La carte n'est construite (build_map(*args, **kwargs)) que si son HTML n'est ni en cache ni précalculé (build.py).
+    """
+    def render():
+        artifact = read_artifact(key)
+        return artifact.decode('utf-8') if artifact is not None else map_to_html(build_map(*args, **kwargs))
+    return _cached_render(key, render)
+
+
+def clear_chart_cache():
+    """
+    Vide le cache des graphiques.
+    """
+    global _charts_bytes
+    with _charts_lock:
+        _charts.clear()
+        _charts_bytes = 0
@@ -0,0 +1,78 @@
+import numpy as np
+import seaborn as sns
+from matplotlib.colors import LogNorm
+
+# Au-delà de ce nombre de points, les graphiques sont calculés sur des données regroupées en classes
+DENSITY_POINT_THRESHOLD = 20000
+
+# Résolution de la grille de densité (nuage de points) et de la grille fine utilisée pour la courbe KDE
+DENSITY_GRIDSIZE = 200
+KDE_GRIDSIZE = 1024
+
+
+def _finite(*arrays):
+    # Suppression des valeurs manquantes ou infinies (ex : communes sans inscrits)
+    arrays = [np.asarray(array, dtype=np.float64) for array in arrays]
+    mask = np.logical_and.reduce([np.isfinite(array) for array in arrays])
+    return [array[mask] for array in arrays]
+
+
+def scatter_or_density(ax, x, y, xlim, ylim, threshold=DENSITY_POINT_THRESHOLD, gridsize=DENSITY_GRIDSIZE, **scatter_kwargs):
+    """
+    Trace un nuage de points exact si le nombre de points est inférieur ou égal à `threshold`.
+    Au-delà, les points sont regroupés dans une grille (np.histogram2d) et la densité est affichée :
+    le coût du tracé ne dépend alors plus du nombre de points.
+    """
+    x, y = _finite(x, y)
+    if len(x) <= threshold:
+        ax.scatter(x, y, **scatter_kwargs)
+    else:
+        counts, x_edges, y_edges = np.histogram2d(x, y, bins=gridsize, range=[xlim, ylim])
+        counts = np.ma.masked_equal(counts, 0)
+        mesh = ax.pcolormesh(x_edges, y_edges, counts.T, cmap='Blues', norm=LogNorm(vmin=1, vmax=max(counts.max(), 1)))
+        ax.figure.colorbar(mesh, ax=ax, label='Points per cell')
+    ax.set_xlim(*xlim)
+    ax.set_ylim(*ylim)
+    return ax
+
+
+def binned_kde(counts, edges):
+    """
+    Estime la densité (noyau gaussien, largeur de bande de Scott) à partir d'un histogramme fin.
+    Retourne les centres des classes et la densité estimée en chacun d'eux.
+    """
+    centers = (edges[:-1] + edges[1:]) / 2
+    step = edges[1] - edges[0]
+    n = counts.sum()
+    mean = (counts * centers).sum() / n
+    std = np.sqrt((counts * (centers - mean) ** 2).sum() / n)
+    bandwidth = std * n ** (-1 / 5)
+
+    # Convolution des effectifs par le noyau gaussien échantillonné sur la grille
+    half_width = max(int(np.ceil(4 * bandwidth / step)), 1)
+    offsets = np.arange(-half_width, half_width + 1) * step
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+    density = np.convolve(counts, kernel, mode='same') / n
+    return centers, density
+
+
+def histogram_with_kde(ax, values, bins=20, threshold=DENSITY_POINT_THRESHOLD, kde_gridsize=KDE_GRIDSIZE):
+    """
+    Trace un histogramme avec une courbe de densité KDE.
+    Jusqu'à `threshold` valeurs, seaborn est utilisé sur les données brutes ; au-delà, l'histogramme et la KDE
+    sont calculés à partir d'effectifs par classe, pour un coût de tracé indépendant du nombre de valeurs.
+    """
+    (values,) = _finite(values)
+    if len(values) <= threshold:
+        return sns.histplot(values, bins=bins, kde=True, ax=ax)
+
+    counts, edges = np.histogram(values, bins=bins)
+    color = sns.color_palette()[0]
+    ax.stairs(counts, edges, fill=True, color=color, alpha=0.4)
+    ax.stairs(counts, edges, color=color)
+
+    # Densité calculée sur une grille fine puis mise à l'échelle des effectifs par classe, comme le fait seaborn
+    fine_counts, fine_edges = np.histogram(values, bins=kde_gridsize, range=(edges[0], edges[-1]))
+    centers, density = binned_kde(fine_counts.astype(np.float64), fine_edges)
+    ax.plot(centers, density * len(values) * (edges[1] - edges[0]), color=color)
+    return ax
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+
+# Colonnes conservées pour chaque commune dans l'index de référence
+GEO_COLUMNS = [
+    'code_commune_INSEE', 'nom_commune_postal', 'code_postal',
+    'latitude', 'longitude', 'code_commune', 'nom_commune_complet',
+    'code_departement', 'nom_departement', 'code_region', 'nom_region'
+]
+
+# Types compacts des colonnes du fichier des communes : codes en chaînes, libellés répétés en catégories,
+# coordonnées en float32
+GEO_DTYPES = {
+    'code_commune_INSEE': str, 'nom_commune_postal': str, 'code_postal': str,
+    'latitude': np.float32, 'longitude': np.float32, 'code_commune': str, 'nom_commune_complet': str,
+    'code_departement': 'category', 'nom_departement': 'category', 'code_region': 'category', 'nom_region': 'category'
+}
+
+# Colonnes catégorielles de l'index (leurs catégories sont recalculées après l'assemblage des morceaux)
+_CATEGORY_COLUMNS = [column for column, dtype in GEO_DTYPES.items() if dtype == 'category']
+
+
+def normalize_insee_code(codes):
+    """
+    Normalise des codes commune INSEE sur 5 caractères (ex : 1001 -> '01001', '2A004' inchangé).
+    """
+    return pd.Series(codes).astype(str).str.strip().str.zfill(5)
+
+
+def partial_commune_index(df_communes):
+    """
+    Dédoublonne un morceau du fichier des communes : une ligne par code INSEE, avec les informations
+    de la première ligne et la somme et le nombre de coordonnées (pour calculer la moyenne après assemblage).
+    Les lignes sans code INSEE sont ignorées (groupby les écarterait, mais pas drop_duplicates).
+    """
+    df = df_communes.loc[df_communes['code_commune_INSEE'].notna(), GEO_COLUMNS].copy()
+    df['code_commune_INSEE'] = normalize_insee_code(df['code_commune_INSEE']).to_numpy()
+
+    grouped = df.groupby('code_commune_INSEE', sort=False)
+    df_partial = df.drop_duplicates('code_commune_INSEE').set_index('code_commune_INSEE', drop=False)
+    df_partial['latitude'] = grouped['latitude'].sum(min_count=1).astype(np.float64)
+    df_partial['longitude'] = grouped['longitude'].sum(min_count=1).astype(np.float64)
+    df_partial['n_coordinates'] = grouped['latitude'].count()
+    return df_partial.reset_index(drop=True)
+
+
+def combine_commune_index(partials):
+    """
+    Assemble les morceaux dédoublonnés en l'index de référence des communes : une ligne par code INSEE,
+    triée et indexée par ce code. Les coordonnées retenues sont la moyenne de toutes les lignes de la commune
+    et les autres informations sont celles de la première ligne.
+    """
+    df = pd.concat(partials, ignore_index=True)
+    grouped = df.groupby('code_commune_INSEE', sort=True)
+    n_coordinates = grouped['n_coordinates'].sum().to_numpy()
+
+    df_index = df.drop_duplicates('code_commune_INSEE').set_index('code_commune_INSEE', drop=False).sort_index()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        df_index['latitude'] = (grouped['latitude'].sum().to_numpy() / n_coordinates).astype(np.float32)
+        df_index['longitude'] = (grouped['longitude'].sum().to_numpy() / n_coordinates).astype(np.float32)
+    for column in _CATEGORY_COLUMNS:
+        df_index[column] = df_index[column].astype(str).where(df_index[column].notna()).astype('category')
+    df_index.index.name = None
+    return df_index[GEO_COLUMNS]
+
+
+def lookup_communes(commune_index, codes):
+    """
+    Retourne les informations géographiques de chaque code (une ligne par code, dans le même ordre)
+    par une recherche dans l'index haché ; les codes absents de l'index donnent une ligne vide.
+    La taille du résultat est toujours égale au nombre de codes.
+    """
+    # reindex s'appuie sur la table de hachage de l'index (codes uniques) : coût linéaire en nombre de codes
+    return commune_index.reindex(pd.Index(codes)).reset_index(drop=True)
+
+
+def unmatched_codes(commune_index, codes):
+    """
+    Retourne les codes absents de l'index de référence (ex : codes d'outre-mer propres au fichier des résultats).
+    """
+    codes = pd.Index(pd.unique(pd.Series(codes).dropna()))
+    return codes[commune_index.index.get_indexer(codes) < 0].sort_values()
@@ -0,0 +1,275 @@
+import functools
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import streamlit as st
+import pandas as pd
+from Pages.geo import GEO_COLUMNS, GEO_DTYPES, combine_commune_index, lookup_communes, normalize_insee_code, partial_commune_index
+from Pages.registry import COMMUNE_PATH, ELECTIONS, available_elections, election_for_path
+from Pages.schema import apply_schema
+
+# Nombre de lignes du fichier des communes lues à la fois
+COMMUNE_CHUNKSIZE = 10000
+
+# Taille des blocs lus pour calculer l'empreinte d'un fichier
+_DIGEST_BLOCK_SIZE = 1 << 20
+
+# Classeurs lus à l'avance par `prefetch_workbooks`, en attente d'entrer dans le cache
+_prefetched_workbooks = {}
+# Classeurs déjà présents dans le cache (clé : signature, skiprows, moteur)
+_parsed_workbooks = set()
+_workbooks_lock = threading.Lock()
+
+
+def file_signature(path):
+    """
+    Retourne la signature d'un fichier (chemin, date de modification, taille).
+    Elle sert de clé de cache : toute modification du fichier invalide les données mémorisées.
+    """
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=16)
+def _file_digest(signature):
+    digest = hashlib.sha256()
+    with open(signature[0], 'rb') as file:
+        for block in iter(lambda: file.read(_DIGEST_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def content_fingerprint(*paths):
+    """
+    Retourne l'empreinte du contenu des fichiers `paths` (SHA-256 de chaque fichier, dans l'ordre).
+    Contrairement à la signature (chemin, date, taille), elle ne change pas quand les fichiers sont copiés
+    sur un autre serveur. Elle n'est recalculée que si les fichiers changent.
+    """
+    return hashlib.sha256(''.join(_file_digest(file_signature(path)) for path in paths).encode()).hexdigest()
+
+
+def _header_names(values):
+    """
+    Construit les noms de colonnes à partir d'une ligne d'en-tête, comme le fait pandas :
+    les cellules vides deviennent 'Unnamed: i' et les doublons sont suffixés ('Nom', 'Nom.1', ...).
+    """
+    names = []
+    counts = {}
+    for i, value in enumerate(values):
+        name = f"Unnamed: {i}" if pd.isna(value) else value
+        cur_count = counts.get(name, 0)
+        while cur_count > 0:
+            counts[name] = cur_count + 1
+            name = f"{name}.{cur_count}"
+            cur_count = counts.get(name, 0)
+        counts[name] = cur_count + 1
+        names.append(name)
+    return names
+
+
+def _frame_from_rows(df_rows, header_row):
+    """
+    Construit un DataFrame à partir des lignes brutes du classeur en utilisant la ligne `header_row` comme en-tête.
+    """
+    df = df_rows.iloc[header_row + 1:].reset_index(drop=True)
+    df.columns = _header_names(df_rows.iloc[header_row].tolist())
+    return df.infer_objects()
+
+
+def parse_presidentielle_workbook(presidentielle_path, skiprows=3, engine='xlrd'):
+    """
+    Lit le classeur des résultats une seule fois et en dérive les deux vues :
+    le DataFrame brut (sans 'skiprows') et le DataFrame dont l'en-tête se trouve après les `skiprows` premières lignes.
+    Fonction sans cache, utilisable dans un processus de travail.
+    """
+    df_rows = pd.read_excel(presidentielle_path, engine=engine, header=None)
+    df_presidentielle_brut = _frame_from_rows(df_rows, 0)
+    df_presidentielle = _frame_from_rows(df_rows, skiprows)
+    return df_presidentielle_brut, df_presidentielle
+
+
+@st.cache_resource(show_spinner="Lecture du fichier des résultats...")
+def _parse_presidentielle_workbook(signature, skiprows, engine):
+    key = (signature, skiprows, engine)
+    with _workbooks_lock:
+        workbook = _prefetched_workbooks.pop(key, None)
+    if workbook is None:
+        workbook = parse_presidentielle_workbook(signature[0], skiprows, engine)
+    with _workbooks_lock:
+        _parsed_workbooks.add(key)
+    return workbook
+
+
+def load_presidentielle_workbook(presidentielle_path, skiprows=3, engine='xlrd'):
+    """
+    Charge le classeur des résultats de la présidentielle en une seule lecture.
+    Retourne le DataFrame brut (sans 'skiprows') et le DataFrame dont l'en-tête se trouve après les `skiprows` premières lignes.
+    Le résultat est partagé entre les sessions et mis en cache selon le chemin, la date de modification et la taille du fichier.
+    """
+    return _parse_presidentielle_workbook(file_signature(presidentielle_path), skiprows, engine)
+
+
+def prefetch_workbooks(elections, max_workers=None):
+    """
+    Lit en parallèle, dans un pool de processus, les classeurs des élections qui ne sont pas encore en cache
+    (la lecture xlrd/openpyxl est limitée par le processeur), puis les place dans le cache.
+    Un classeur illisible est ignoré ici : l'erreur est levée lors de son chargement par `load_clean_data`.
+    """
+    pending = {}
+    for election in elections:
+        key = (file_signature(election['path']), election['skiprows'], election['engine'])
+        with _workbooks_lock:
+            if key not in _parsed_workbooks and key not in _prefetched_workbooks:
+                pending[key] = election
+
+    if len(pending) > 1:
+        # 'spawn' : le serveur Streamlit est multi-thread, un fork pourrait copier des verrous dans un état incohérent
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=max_workers or min(len(pending), os.cpu_count() or 1), mp_context=context) as executor:
+            futures = {
+                key: executor.submit(parse_presidentielle_workbook, election['path'], election['skiprows'], election['engine'])
+                for key, election in pending.items()
+            }
+            for key, future in futures.items():
+                try:
+                    workbook = future.result()
+                except Exception:
+                    continue
+                with _workbooks_lock:
+                    _prefetched_workbooks[key] = workbook
+                election = pending[key]
+                load_presidentielle_workbook(election['path'], election['skiprows'], election['engine'])
+
+
+def candidate_columns_by_position(df_presidentielle, election):
+    """
+    Retourne la correspondance {colonne du fichier: nom normalisé} des colonnes Nom, Prénom et Voix de chaque candidat.
+    Les blocs de colonnes des candidats sont repérés par position à partir de la première colonne 'Nom',
+    car les en-têtes des blocs suivants varient selon les fichiers ('Nom.1' ou 'Unnamed: 30').
+    """
+    columns = list(df_presidentielle.columns)
+    first = columns.index('Nom')
+    offsets = [columns.index('Prénom') - first, columns.index('Voix') - first]
+    mapping = {}
+    for i in range(election['candidate_slots']):
+        start = first + i * election['candidate_stride']
+        suffix = '' if i == 0 else f'.{i}'
+        for name, position in zip(['Nom', 'Prénom', 'Voix'], [start, start + offsets[0], start + offsets[1]]):
+            mapping[columns[position]] = f'{name}{suffix}'
+    return mapping
+
+
+def stream_commune_index(commune_path, chunksize=COMMUNE_CHUNKSIZE):
+    """
+    Construit l'index de référence des communes en lisant le fichier CSV par morceaux, avec uniquement
+    les colonnes utiles et des types compacts ; chaque morceau est dédoublonné dès sa lecture,
+    de sorte que la mémoire nécessaire ne dépend que de la taille d'un morceau et du nombre de communes.
+    """
+    reader = pd.read_csv(commune_path, usecols=GEO_COLUMNS, dtype=GEO_DTYPES, chunksize=chunksize)
+    return combine_commune_index([partial_commune_index(chunk) for chunk in reader])
+
+
+@st.cache_resource(show_spinner="Construction de l'index des communes...")
+def _build_commune_index(signature):
+    return stream_commune_index(signature[0])
+
+
+def load_commune_index(commune_path):
+    """
+    Retourne l'index de référence des communes (une ligne par code INSEE), mis en cache selon la signature du fichier.
+    """
+    return _build_commune_index(file_signature(commune_path))
+
+
+def clean_presidentielle(df_presidentielle, election):
+    """
+    Nettoie le DataFrame des résultats (en-tête déjà appliqué) : colonnes utiles, colonnes des candidats renommées,
+    code INSEE combiné et types compacts. Fonction pure, sans cache ni Streamlit.
+    """
+    # Sélectionner les colonnes pertinentes dans le dataset présidentiel
+    columns_to_keep = [
+        'Code du département', 'Libellé du département', 'Code de la commune', 'Libellé de la commune',
+        'Inscrits', 'Abstentions', 'Votants', 'Blancs', 'Nuls', 'Exprimés'
+    ]
+
+    # Nettoyer le dataset présidentiel en sélectionnant uniquement les colonnes pertinentes,
+    # les colonnes des candidats étant renommées 'Nom', 'Prénom', 'Voix', 'Nom.1', ... quelle que soit l'élection
+    candidates = candidate_columns_by_position(df_presidentielle, election)
+    df_presidentielle_clean = df_presidentielle[columns_to_keep + list(candidates)].rename(columns=candidates)
+
+    # Convertir les codes de département et commune en chaînes de caractères et créer un code combiné unique (code INSEE sur 5 caractères)
+    df_presidentielle_clean['Code du département'] = df_presidentielle_clean['Code du département'].astype(str)
+    df_presidentielle_clean['Code de la commune'] = df_presidentielle_clean['Code de la commune'].astype(str)
+    df_presidentielle_clean['code_commune_combined'] = normalize_insee_code(
+        df_presidentielle_clean['Code du département'] + df_presidentielle_clean['Code de la commune'].str.zfill(3)
+    ).to_numpy()
+
+    # Types compacts (catégories, entiers 32 bits, codes en chaînes Arrow) appliqués dès le chargement
+    return apply_schema(df_presidentielle_clean)
+
+
+def merge_communes(df_presidentielle_clean, commune_index):
+    """
+    Associe à chaque commune des résultats sa ligne de l'index de référence des communes et calcule
+    le taux de participation. Fonction pure, sans cache ni Streamlit.
+    """
+    # Contrairement à une fusion sur le fichier des communes (une ligne par code postal), aucune ligne n'est dupliquée
+    df_geo = lookup_communes(commune_index, df_presidentielle_clean['code_commune_combined'])
+    df_combined = pd.concat([df_presidentielle_clean.reset_index(drop=True), df_geo], axis=1)
+
+    # Calcul du taux de participation une seule fois, la copie partagée n'étant plus modifiée par les pages
+    df_combined['Taux_participation'] = (df_combined['Votants'] / df_combined['Inscrits']) * 100
+    return apply_schema(df_combined)
+
+
+@st.cache_resource(show_spinner="Nettoyage et fusion des données...")
+def _clean_and_merge(presidentielle_signature, commune_signature):
+    # Le résultat est calculé une seule fois par processus et partagé entre toutes les sessions
+    presidentielle_path = presidentielle_signature[0]
+    commune_path = commune_signature[0]
+    election = election_for_path(presidentielle_path)
+
+    # Une seule lecture du classeur : version brute (sans 'skiprows') et version après la ligne d'en-tête
+    df_presidentielle_brut, df_presidentielle = load_presidentielle_workbook(
+        presidentielle_path, skiprows=election['skiprows'], engine=election['engine']
+    )
+    df_presidentielle_clean = clean_presidentielle(df_presidentielle, election)
+
+    # Données des communes nettoyées : l'index de référence, lu par morceaux (une ligne par code INSEE)
+    commune_index = load_commune_index(commune_path)
+    df_communes_clean = apply_schema(commune_index.reset_index(drop=True))
+
+    df_combined = merge_communes(df_presidentielle_clean, commune_index)
+    return df_presidentielle_brut, df_presidentielle_clean, df_communes_clean, df_combined
+
+
+def load_clean_data(presidentielle_path, commune_path):
+    """
+    Retourne les DataFrames brut, nettoyés et fusionné (présidentielle brute, présidentielle nettoyée, communes, fusion).
+    Ils sont calculés une seule fois par processus, mis en cache selon la signature des deux fichiers
+    et partagés entre toutes les sessions : ils ne doivent pas être modifiés.
+    """
+    return _clean_and_merge(file_signature(presidentielle_path), file_signature(commune_path))
+
+
+def load_elections(keys=None, commune_path=COMMUNE_PATH):
+    """
+    Retourne les données nettoyées de plusieurs élections, {clé: (brut, présidentielle nettoyée, communes, fusion)},
+    et les erreurs des élections qui n'ont pas pu être chargées, {clé: exception} : l'échec d'une élection
+    (ex : fichier dont les colonnes ne suivent pas la disposition du registre) n'empêche pas de charger les autres.
+    Les classeurs absents du cache sont d'abord lus en parallèle ; toutes les élections partagent ensuite
+    le cache de `load_clean_data`. Par défaut, toutes les élections dont le fichier des résultats est présent sont chargées.
+    """
+    if keys is None:
+        keys = [key for key in available_elections() if os.path.exists(ELECTIONS[key]['path'])]
+    prefetch_workbooks([ELECTIONS[key] for key in keys])
+
+    elections, errors = {}, {}
+    for key in keys:
+        try:
+            elections[key] = load_clean_data(ELECTIONS[key]['path'], commune_path)
+        except Exception as error:
+            errors[key] = error
+    return elections, errors
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import folium
+from folium.plugins import FastMarkerCluster
+
+# Précision des coordonnées envoyées au navigateur (5 décimales, soit environ 1 m)
+COORDINATE_DECIMALS = 5
+
+# Fonction JavaScript appelée par le navigateur pour créer chaque marqueur à partir d'une ligne [lat, lon, popup]
+_MARKER_CALLBACK = """
+function (row) {
+    var marker = L.marker(new L.LatLng(row[0], row[1]));
+    marker.bindPopup(row[2]);
+    return marker;
+}
+"""
+
+
+def format_popups(fields):
+    """
+    Construit les textes de popup de toutes les lignes par opérations vectorisées sur les colonnes.
+    `fields` est une liste de (libellé, valeurs, format) où format est un format printf (ex : '%.2f') ou None.
+    Retourne un tableau de chaînes 'libellé: valeur<br>libellé: valeur...'.
+    """
+    popups = None
+    for label, values, fmt in fields:
+        values = np.asarray(values)
+        text = np.char.mod(fmt, values) if fmt else values.astype(str)
+        text = np.char.add(f"{label}: ", text)
+        popups = text if popups is None else np.char.add(np.char.add(popups, "<br>"), text)
+    return popups
+
+
+def department_centroids(df):
+    """
+    Retourne le centre (moyenne des coordonnées des communes) de chaque département, indexé par code de département,
+    calculé en un seul groupby.
+    """
+    return df.dropna(subset=['latitude', 'longitude']).groupby('code_departement', observed=True)[['latitude', 'longitude']].mean()
+
+
+def commune_marker_layer(latitudes, longitudes, popups, color='blue', icon='info-sign', name=None):
+    """
+    Construit une couche de marqueurs (un par commune) à partir de tableaux de coordonnées et de popups.
+    Destinée aux petits échantillons : chaque marqueur est un objet folium.
+    """
+    layer = folium.FeatureGroup(name=name)
+    for latitude, longitude, popup in zip(np.asarray(latitudes).tolist(), np.asarray(longitudes).tolist(), popups):
+        folium.Marker(location=[latitude, longitude], popup=str(popup), icon=folium.Icon(color=color, icon=icon)).add_to(layer)
+    return layer
+
+
+def department_circle_layer(df_departments, centroids, value_column, scaling_factor, popups, name=None):
+    """
+    Construit une couche de cercles proportionnels, centrés sur le centre de chaque département.
+    `df_departments` contient une ligne par département (colonne 'code_departement') et `centroids`
+    est la table retournée par `department_centroids` ; les départements sans coordonnées sont ignorés.
+    """
+    positions = centroids.index.get_indexer(df_departments['code_departement'])
+    located = positions >= 0
+    coordinates = centroids.to_numpy()[positions[located]]
+    radii = df_departments[value_column].to_numpy()[located] * scaling_factor
+
+    layer = folium.FeatureGroup(name=name)
+    for (latitude, longitude), radius, popup in zip(coordinates.tolist(), radii.tolist(), np.asarray(popups)[located]):
+        folium.Circle(
+            location=[latitude, longitude], radius=radius, color='crimson', fill=True, fill_opacity=0.6, popup=str(popup)
+        ).add_to(layer)
+    return layer
+
+
+def commune_cluster_layer(latitudes, longitudes, popups, name=None):
+    """
+    Construit une couche de marqueurs regroupés à partir de tableaux de coordonnées et de textes de popup.
+    Les marqueurs sont transmis en un seul tableau JSON et créés par le navigateur (FastMarkerCluster),
+    au lieu d'un objet folium.Marker par commune sérialisé individuellement dans le HTML.
+    """
+    latitudes = np.round(np.asarray(latitudes, dtype=np.float64), COORDINATE_DECIMALS)
+    longitudes = np.round(np.asarray(longitudes, dtype=np.float64), COORDINATE_DECIMALS)
+    popups = pd.Series(popups).astype(str).to_numpy(dtype=object)
+
+    data = np.empty((len(latitudes), 3), dtype=object)
+    data[:, 0] = latitudes
+    data[:, 1] = longitudes
+    data[:, 2] = popups
+    return FastMarkerCluster(data.tolist(), callback=_MARKER_CALLBACK, name=name)
@@ -0,0 +1,158 @@
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows : pas de mesure de la mémoire maximale du processus
+    resource = None
+
+try:
+    import psutil
+except ImportError:  # psutil est facultatif : sous Linux, la mémoire résidente est lue dans /proc
+    psutil = None
+
+# Nombre de mesures conservées par étape ; au-delà, les plus anciennes sont supprimées
+METRICS_WINDOW = 1000
+
+# Percentiles de latence affichés et exportés
+PERCENTILES = (50, 90, 99)
+
+# Fichier de la mémoire du processus sous Linux (taille totale et pages résidentes)
+_STATM_PATH = '/proc/self/statm'
+
+# Mesures partagées par toutes les sessions du processus :
+# étape -> [(durée en s, mémoire résidente après l'étape, variation pendant l'étape, maximum du processus), en octets]
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def current_memory():
+    """
+    Retourne la mémoire résidente actuelle du processus, en octets (None si indisponible).
+    """
+    try:
+        with open(_STATM_PATH) as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    return None
+
+
+def peak_memory():
+    """
+    Retourne la mémoire résidente maximale atteinte par le processus depuis son démarrage, en octets (None si indisponible).
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est exprimé en kilo-octets sous Linux et en octets sous macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def record(stage, seconds, memory=None, delta=None, process_peak=None):
+    """
+    Enregistre une mesure de l'étape `stage`.
+    """
+    with _metrics_lock:
+        _metrics.setdefault(stage, deque(maxlen=METRICS_WINDOW)).append((seconds, memory, delta, process_peak))
+
+
+@contextmanager
+def measure(stage):
+    """
+    Mesure la durée du bloc et la variation de la mémoire résidente du processus entre son début et sa fin,
+    puis l'enregistre sous le nom `stage` (la mesure est enregistrée même si le bloc lève une exception).
+    Les sessions étant servies en parallèle, la variation peut inclure les allocations d'autres sessions.
+    """
+    memory_before = current_memory()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        memory_after = current_memory()
+        delta = memory_after - memory_before if memory_after is not None and memory_before is not None else None
+        record(stage, seconds, memory_after, delta, peak_memory())
+
+
+def timed(stage):
+    """
+    Décorateur : mesure chaque appel de la fonction sous le nom `stage` (voir `measure`).
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with measure(stage):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def metrics_summary():
+    """
+    Retourne un DataFrame (une ligne par étape) : nombre d'appels, percentiles de latence (ms),
+    plus forte mémoire résidente mesurée à la fin de l'étape, plus forte hausse de la mémoire résidente
+    pendant l'étape et mémoire maximale atteinte par le processus (Mo).
+    """
+    with _metrics_lock:
+        samples = {stage: list(values) for stage, values in _metrics.items()}
+
+    def largest(values):
+        values = [value for value in values if value is not None]
+        return max(values) / 2 ** 20 if values else np.nan
+
+    rows = {}
+    for stage, values in samples.items():
+        seconds = np.array([value[0] for value in values])
+        row = {'calls': len(values)}
+        for percentile, latency in zip(PERCENTILES, np.percentile(seconds * 1000, PERCENTILES)):
+            row[f'p{percentile} (ms)'] = latency
+        row['memory after (MB)'] = largest(value[1] for value in values)
+        row['max increase (MB)'] = largest(value[2] for value in values)
+        row['process peak (MB)'] = largest(value[3] for value in values)
+        rows[stage] = row
+
+    summary = pd.DataFrame.from_dict(rows, orient='index')
+    summary.index.name = 'stage'
+    return summary.sort_index().round(2)
+
+
+def metrics_json():
+    """
+    Retourne les mesures résumées au format JSON (pour les outils de supervision).
+    """
+    summary = metrics_summary()
+    return json.dumps({
+        'generated_at': time.time(),
+        'stages': {
+            stage: {key: (None if pd.isna(value) else value) for key, value in row.items()}
+            for stage, row in summary.to_dict(orient='index').items()
+        },
+    }, indent=2)
+
+
+def dump_metrics(path):
+    """
+    Écrit les mesures résumées au format JSON dans le fichier `path`.
+    """
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(metrics_json())
+    return path
+
+
+def clear_metrics():
+    """
+    Supprime toutes les mesures.
+    """
+    with _metrics_lock:
+        _metrics.clear()
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from Pages.snapshot import dataset_key
+from Pages.aggregation import load_cube, rollup
+from Pages.metrics import timed
+
+# Tranches de taille des communes (nombre d'inscrits) : libellé -> (borne basse incluse, borne haute exclue)
+SIZE_BANDS = {
+    "Under 500 voters": (0, 500),
+    "500 - 2,000 voters": (500, 2000),
+    "2,000 - 10,000 voters": (2000, 10000),
+    "10,000+ voters": (10000, np.inf),
+}
+
+# Dimensions filtrables : nom de la dimension -> colonne du niveau commune du cube
+FILTER_COLUMNS = {
+    'region': 'code_region',
+    'departement': 'code_departement',
+}
+
+# Toutes les dimensions filtrables, y compris la tranche de taille des communes
+FILTER_DIMENSIONS = list(FILTER_COLUMNS) + ['taille']
+
+
+def group_index(codes, labels):
+    """
+    Construit l'index groupé d'une dimension à partir du code entier de chaque ligne (-1 pour une valeur manquante).
+    Les positions des lignes sont triées par groupe (tri stable) : les lignes du groupe `i` sont
+    `order[offsets[i]:offsets[i + 1]]`, dans l'ordre d'origine.
+    """
+    codes = np.asarray(codes, dtype=np.int32)
+    order = np.argsort(codes, kind='stable').astype(np.int32)
+    n_missing = np.count_nonzero(codes < 0)
+    counts = np.bincount(codes[codes >= 0], minlength=len(labels))
+    offsets = np.concatenate([[0], np.cumsum(counts)]) + n_missing
+    return {'labels': pd.Index(labels), 'codes': codes, 'order': order, 'offsets': offsets}
+
+
+def build_query_index(df_commune):
+    """
+    Construit les index groupés (région, département, tranche de taille) des lignes du niveau commune du cube.
+    Ils sont calculés une seule fois par version des données.
+    """
+    index = {}
+    for dimension, column in FILTER_COLUMNS.items():
+        codes, labels = pd.factorize(df_commune[column], sort=True)
+        index[dimension] = group_index(codes, np.asarray(labels, dtype=object))
+
+    # Tranche de taille : position du nombre d'inscrits parmi les bornes basses des tranches
+    lower_bounds = np.array([low for low, _ in SIZE_BANDS.values()])
+    band_codes = np.searchsorted(lower_bounds, df_commune['Inscrits'].to_numpy(), side='right') - 1
+    index['taille'] = group_index(band_codes, list(SIZE_BANDS))
+    return index
+
+
+def _group_codes(group, labels):
+    codes = group['labels'].get_indexer(list(labels))
+    return codes[codes >= 0]
+
+
+def resolve_positions(index, filters):
+    """
+    Retourne les positions (triées) des lignes retenues par les filtres, ou None si aucun filtre n'est actif.
+    `filters` associe à chaque dimension de l'index les libellés retenus (une sélection vide ne filtre pas).
+    La dimension la plus sélective est résolue par concaténation de tranches de l'index ; les autres dimensions
+    sont vérifiées par une simple lecture des codes des lignes retenues : le coût est proportionnel au nombre k
+    de lignes sélectionnées, et non à la taille du DataFrame.
+    """
+    active = [(index[dimension], _group_codes(index[dimension], labels)) for dimension, labels in filters.items() if labels]
+    if not active:
+        return None
+
+    sizes = [(group['offsets'][codes + 1] - group['offsets'][codes]).sum() for group, codes in active]
+    group, codes = active.pop(int(np.argmin(sizes)))
+    positions = np.sort(np.concatenate(
+        [group['order'][group['offsets'][code]:group['offsets'][code + 1]] for code in codes] or [np.empty(0, np.int32)]
+    ))
+
+    for group, codes in active:
+        # Table de correspondance code -> retenu, la dernière case correspondant aux valeurs manquantes (code -1)
+        allowed = np.zeros(len(group['labels']) + 1, dtype=bool)
+        allowed[codes] = True
+        positions = positions[allowed[group['codes'][positions]]]
+    return positions
+
+
+@st.cache_resource(show_spinner="Indexation des communes...")
+def _load_query_index(key, presidentielle_path, commune_path):
+    return build_query_index(load_cube(presidentielle_path, commune_path)['commune'])
+
+
+def load_query_index(presidentielle_path, commune_path):
+    """
+    Retourne les index de filtrage, partagés entre les sessions et reconstruits uniquement si les données changent.
+    """
+    return _load_query_index(dataset_key(presidentielle_path, commune_path), presidentielle_path, commune_path)
+
+
+@timed("select")
+def select(presidentielle_path, commune_path, df, filters):
+    """
+    Retourne le DataFrame fusionné et le cube restreints aux communes retenues par les filtres.
+    Sans filtre actif, les objets partagés sont retournés tels quels ; sinon seules les k lignes retenues sont copiées
+    et les niveaux département, région et national sont recalculés à partir de ces lignes.
+    """
+    cube = load_cube(presidentielle_path, commune_path)
+    positions = resolve_positions(load_query_index(presidentielle_path, commune_path), filters)
+    if positions is None:
+        return df, cube
+    return df.iloc[positions], rollup(cube['commune'].iloc[positions], cube['candidats'])
@@ -0,0 +1,73 @@
+import os
+
+# Fichier de référence des communes, commun à toutes les élections
+COMMUNE_PATH = "./communes-departement-region.csv"
+
+# Élections disponibles : fichier des résultats par commune, instantané colonnaire et disposition des colonnes.
+# - skiprows : nombre de lignes avant la ligne d'en-tête
+# - candidate_slots : nombre de candidats (blocs de colonnes répétés)
+# - candidate_stride : nombre de colonnes par bloc candidat (N°Panneau, Sexe, Nom, Prénom, Voix, % Voix/Ins, % Voix/Exp)
+ELECTIONS = {
+    '2017-T1': {
+        'label': "Présidentielle 2017 - 1er tour",
+        'path': "./Presidentielle_2017_Resultats_Communes_Tour_1_c.xls",
+        'snapshot': "./df_combined.arrow",
+        'engine': 'xlrd',
+        'skiprows': 3,
+        'candidate_slots': 11,
+        'candidate_stride': 7,
+    },
+    '2017-T2': {
+        'label': "Présidentielle 2017 - 2nd tour",
+        'path': "./Presidentielle_2017_Resultats_Communes_Tour_2_c.xls",
+        'snapshot': "./df_combined_2017_T2.arrow",
+        'engine': 'xlrd',
+        'skiprows': 3,
+        'candidate_slots': 2,
+        'candidate_stride': 7,
+    },
+    '2022-T1': {
+        'label': "Présidentielle 2022 - 1er tour",
+        'path': "./resultats-par-niveau-subcom-t1-france-entiere.xlsx",
+        'snapshot': "./df_combined_2022_T1.arrow",
+        'engine': 'openpyxl',
+        'skiprows': 0,
+        'candidate_slots': 12,
+        'candidate_stride': 7,
+    },
+    '2022-T2': {
+        'label': "Présidentielle 2022 - 2nd tour",
+        'path': "./resultats-par-niveau-subcom-t2-france-entiere.xlsx",
+        'snapshot': "./df_combined_2022_T2.arrow",
+        'engine': 'openpyxl',
+        'skiprows': 0,
+        'candidate_slots': 2,
+        'candidate_stride': 7,
+    },
+}
+
+# Élection affichée par défaut
+DEFAULT_ELECTION = '2017-T1'
+
+
+def election_for_path(presidentielle_path):
+    """
+    Retourne la description de l'élection dont le fichier des résultats est `presidentielle_path`.
+    Lève KeyError si le fichier n'est pas enregistré : sa disposition (skiprows, moteur, nombre de candidats)
+    est inconnue et le lire avec celle d'une autre élection donnerait des colonnes erronées sans erreur.
+    """
+    path = os.path.abspath(presidentielle_path)
+    for election in ELECTIONS.values():
+        if os.path.abspath(election['path']) == path:
+            return election
+    raise KeyError(f"Fichier des résultats absent du registre des élections : {presidentielle_path}")
+
+
+def available_elections():
+    """
+    Retourne les clés des élections dont le fichier des résultats ou l'instantané est présent.
+    """
+    return [
+        key for key, election in ELECTIONS.items()
+        if os.path.exists(election['path']) or os.path.exists(election['snapshot'])
+    ]
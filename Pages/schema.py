@@ -0,0 +1,88 @@
+import pandas as pd
+
+# Codes (commune, INSEE, postal) et libellés uniques : chaînes stockées dans un tampon Arrow contigu
+CODE_DTYPE = pd.StringDtype('pyarrow')
+
+# Compteurs de voix : entiers 32 bits (plus de 2 milliards de voix par commune ne sont pas à craindre)
+COUNT_DTYPE = 'int32'
+
+# Type compact de chaque colonne des DataFrames nettoyés
+SCHEMA = {
+    # Résultats de la présidentielle
+    'Code du département': 'category',
+    'Libellé du département': 'category',
+    'Code de la commune': CODE_DTYPE,
+    'Libellé de la commune': CODE_DTYPE,
+    'Inscrits': COUNT_DTYPE,
+    'Abstentions': COUNT_DTYPE,
+    'Votants': COUNT_DTYPE,
+    'Blancs': COUNT_DTYPE,
+    'Nuls': COUNT_DTYPE,
+    'Exprimés': COUNT_DTYPE,
+    'code_commune_combined': CODE_DTYPE,
+    'Taux_participation': 'float32',
+    # Référentiel des communes
+    'code_commune_INSEE': CODE_DTYPE,
+    'nom_commune_postal': CODE_DTYPE,
+    'code_postal': CODE_DTYPE,
+    'latitude': 'float32',
+    'longitude': 'float32',
+    'code_commune': CODE_DTYPE,
+    'nom_commune_complet': CODE_DTYPE,
+    'code_departement': 'category',
+    'nom_departement': 'category',
+    'code_region': 'category',
+    'nom_region': 'category',
+}
+
+
+def column_dtype(column):
+    """
+    Retourne le type compact d'une colonne, ou None si la colonne n'est pas décrite par le schéma.
+    Les colonnes des candidats ('Nom', 'Prénom', 'Voix' et leurs suffixes '.1', '.2', ...) sont reconnues par leur préfixe.
+    """
+    if column in SCHEMA:
+        return SCHEMA[column]
+    base = str(column).split('.')[0]
+    if base in ('Nom', 'Prénom'):
+        return 'category'
+    if base == 'Voix':
+        return COUNT_DTYPE
+    return None
+
+
+def apply_schema(df):
+    """
+    Retourne une copie de `df` dont chaque colonne décrite par le schéma est convertie dans son type compact.
+    Les colonnes entières contenant des valeurs manquantes utilisent le type entier nullable correspondant ('Int32').
+    """
+    converted = {}
+    for column in df.columns:
+        dtype = column_dtype(column)
+        if dtype is None or df[column].dtype == dtype:
+            continue
+        if dtype == COUNT_DTYPE and df[column].isna().any():
+            dtype = COUNT_DTYPE.capitalize()
+        converted[column] = df[column].astype(dtype)
+    return df.assign(**converted) if converted else df.copy()
+
+
+def memory_report(df):
+    """
+    Retourne l'occupation mémoire de chaque colonne de `df` (type, Mo, part du total), de la plus coûteuse à la moins coûteuse.
+    """
+    usage = df.memory_usage(index=False, deep=True)
+    report = pd.DataFrame({
+        'dtype': df.dtypes.astype(str),
+        'Mo': usage / 2 ** 20,
+        '%': usage / max(usage.sum(), 1) * 100,
+    })
+    report.index.name = 'colonne'
+    return report.sort_values('Mo', ascending=False).round({'Mo': 3, '%': 1})
+
+
+def total_memory(df):
+    """
+    Retourne l'occupation mémoire totale de `df` en Mo.
+    """
+    return df.memory_usage(index=True, deep=True).sum() / 2 ** 20
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import streamlit as st
+import pyarrow as pa
+import pyarrow.feather as feather
+from Pages.ingestion import content_fingerprint, file_signature, load_clean_data
+from Pages.registry import COMMUNE_PATH, ELECTIONS, election_for_path
+from Pages.metrics import timed
+from Pages.schema import SCHEMA
+
+# Chaque élection a son instantané colonnaire (format Arrow IPC non compressé, en un seul bloc de lignes, lisible par memory-map)
+# du DataFrame fusionné, dont le chemin est indiqué dans le registre des élections
+
+# Version du contenu de l'instantané : à incrémenter à chaque modification du nettoyage ou de la fusion des données
+# (lignes ou colonnes produites), pour que les instantanés construits par une version précédente soient reconstruits
+SNAPSHOT_VERSION = 2
+
+# Clés des métadonnées du schéma Arrow : signature des fichiers sources, version du code qui a construit l'instantané
+# et empreinte du contenu des fichiers sources
+_SOURCES_METADATA_KEY = b"sources"
+_PIPELINE_METADATA_KEY = b"pipeline"
+_FINGERPRINT_METADATA_KEY = b"fingerprint"
+
+
+def _sources_metadata(presidentielle_path, commune_path):
+    # Seules la date de modification et la taille sont conservées : l'instantané reste valide si le dossier est déplacé
+    return json.dumps({
+        'presidentielle': list(file_signature(presidentielle_path)[1:]),
+        'communes': list(file_signature(commune_path)[1:]),
+    })
+
+
+def _pipeline_metadata():
+    # Version du nettoyage et de la fusion, et empreinte du schéma des types compacts
+    schema = hashlib.sha256(repr(sorted((column, str(dtype)) for column, dtype in SCHEMA.items())).encode()).hexdigest()
+    return json.dumps({'version': SNAPSHOT_VERSION, 'schema': schema})
+
+
+def build_snapshot(presidentielle_path, commune_path, snapshot_path=None):
+    """
+    Charge, nettoie et fusionne les données sources puis écrit le DataFrame fusionné dans un instantané colonnaire typé.
+    La signature des fichiers sources et la version du code sont enregistrées dans les métadonnées pour détecter un instantané périmé,
+    ainsi que l'empreinte du contenu des fichiers sources (voir `snapshot_fingerprint`).
+    """
+    snapshot_path = snapshot_path or election_for_path(presidentielle_path)['snapshot']
+    df_combined = load_clean_data(presidentielle_path, commune_path)[3].copy()
+
+    # Les colonnes 'object' peuvent mélanger entiers et chaînes (ex : codes '2A') : elles sont typées en chaînes
+    for column in df_combined.columns[df_combined.dtypes == object]:
+        df_combined[column] = df_combined[column].astype('string')
+
+    # Un seul bloc de lignes : chaque colonne est un tampon contigu, que `_read_snapshot` peut exposer sans copie
+    table = pa.Table.from_pandas(df_combined, preserve_index=False).combine_chunks()
+    metadata = dict(table.schema.metadata or {})
+    metadata[_SOURCES_METADATA_KEY] = _sources_metadata(presidentielle_path, commune_path).encode()
+    metadata[_PIPELINE_METADATA_KEY] = _pipeline_metadata().encode()
+    metadata[_FINGERPRINT_METADATA_KEY] = content_fingerprint(presidentielle_path, commune_path).encode()
+    table = table.replace_schema_metadata(metadata)
+
+    # Écriture dans un fichier temporaire puis renommage, pour ne jamais exposer un instantané incomplet
+    tmp_path = f"{snapshot_path}.tmp"
+    feather.write_feather(table, tmp_path, compression='uncompressed', chunksize=max(len(table), 1))
+    os.replace(tmp_path, snapshot_path)
+    return snapshot_path
+
+
+def snapshot_is_fresh(presidentielle_path, commune_path, snapshot_path=None):
+    """
+    Indique si l'instantané existe, a été construit par la version actuelle du nettoyage et de la fusion
+    (SNAPSHOT_VERSION et schéma des types) et correspond aux fichiers sources actuels.
+    Si les fichiers sources ne sont pas présents, l'instantané fait foi pourvu que sa version soit la bonne.
+    """
+    snapshot_path = snapshot_path or election_for_path(presidentielle_path)['snapshot']
+    if not os.path.exists(snapshot_path):
+        return False
+    metadata = feather.read_table(snapshot_path, columns=[], memory_map=True).schema.metadata or {}
+    pipeline = metadata.get(_PIPELINE_METADATA_KEY)
+    if pipeline is None or pipeline.decode() != _pipeline_metadata():
+        return False
+    if not (os.path.exists(presidentielle_path) and os.path.exists(commune_path)):
+        return True
+    stored = metadata.get(_SOURCES_METADATA_KEY)
+    return stored is not None and stored.decode() == _sources_metadata(presidentielle_path, commune_path)
+
+
+def snapshot_fingerprint(snapshot_path):
+    """
+    Retourne l'empreinte du contenu des fichiers sources à partir desquels l'instantané a été construit,
+    ou None si l'instantané ne l'a pas enregistrée.
+    """
+    metadata = feather.read_table(snapshot_path, columns=[], memory_map=True).schema.metadata or {}
+    fingerprint = metadata.get(_FINGERPRINT_METADATA_KEY)
+    return fingerprint.decode() if fingerprint is not None else None
+
+
+def dataset_key(presidentielle_path, commune_path, snapshot_path=None):
+    """
+    Retourne une clé identifiant la version des données servies par `load_combined_data`.
+    Elle permet de mettre en cache les calculs dérivés du DataFrame fusionné sans avoir à le hacher.
+    """
+    snapshot_path = snapshot_path or election_for_path(presidentielle_path)['snapshot']
+    if snapshot_is_fresh(presidentielle_path, commune_path, snapshot_path):
+        return ('snapshot',) + file_signature(snapshot_path)
+    return ('sources',) + file_signature(presidentielle_path) + file_signature(commune_path)
+
+
+@st.cache_resource(show_spinner="Lecture de l'instantané des données...")
+def _read_snapshot(signature, columns):
+    # memory_map : seules les pages des colonnes demandées sont lues depuis le disque.
+    # split_blocks : une colonne par bloc pandas, sans regroupement ; les colonnes numériques sans valeur manquante
+    # et les colonnes de chaînes restent adossées aux pages du fichier (aucune copie), seuls les codes des catégories sont copiés
+    table = feather.read_table(signature[0], columns=list(columns) if columns is not None else None, memory_map=True)
+    return table.to_pandas(split_blocks=True)
+
+
+@st.cache_resource(show_spinner=False)
+def _select_columns(presidentielle_signature, commune_signature, columns):
+    # Sélection de colonnes partagée entre les sessions : une seule projection par jeu de colonnes et par version des données
+    df_combined = load_clean_data(presidentielle_signature[0], commune_signature[0])[3]
+    return df_combined if columns is None else df_combined[list(columns)]
+
+
+@timed("load_combined_data")
+def load_combined_data(presidentielle_path, commune_path, columns=None, snapshot_path=None):
+    """
+    Retourne le DataFrame fusionné en ne chargeant que les colonnes demandées.
+    L'instantané colonnaire est utilisé s'il est à jour ; sinon les fichiers sources sont relus.
+    Lu depuis l'instantané, le DataFrame est en grande partie adossé au fichier projeté en mémoire (tableaux en lecture seule).
+    Le DataFrame retourné est partagé par toutes les sessions du processus : il ne doit pas être modifié.
+    """
+    snapshot_path = snapshot_path or election_for_path(presidentielle_path)['snapshot']
+    columns = tuple(columns) if columns is not None else None
+    if snapshot_is_fresh(presidentielle_path, commune_path, snapshot_path):
+        return _read_snapshot(file_signature(snapshot_path), columns)
+
+    return _select_columns(file_signature(presidentielle_path), file_signature(commune_path), columns)
+
+
+if __name__ == "__main__":
+    # Étape de construction : python -m Pages.snapshot (un instantané par élection dont le fichier des résultats est présent)
+    for election in ELECTIONS.values():
+        if os.path.exists(election['path']):
+            path = build_snapshot(election['path'], COMMUNE_PATH, election['snapshot'])
+            print(f"Instantané écrit dans {path}")
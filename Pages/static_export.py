@@ -0,0 +1,71 @@
+import functools
+import json
+import os
+from Pages.ingestion import content_fingerprint, file_signature
+from Pages.registry import election_for_path
+from Pages.snapshot import snapshot_fingerprint
+
+# Dossier des graphiques et cartes précalculés (python build.py) et manifeste qui les décrit
+STATIC_DIR = "./static"
+MANIFEST_NAME = "manifest.json"
+
+
+def data_fingerprint(presidentielle_path, commune_path, snapshot_path=None):
+    """
+    Retourne l'empreinte du contenu des fichiers sources d'une élection. Si les fichiers sources ne sont pas présents,
+    c'est celle que l'instantané a enregistrée lors de sa construction : une instance qui ne dispose que de l'instantané
+    obtient ainsi la même empreinte que build.py, exécuté avec les fichiers sources, et sert les mêmes artefacts.
+    Un instantané construit sans cette empreinte est identifié par son propre contenu (aucun artefact ne correspond alors).
+    """
+    if os.path.exists(presidentielle_path) and os.path.exists(commune_path):
+        return content_fingerprint(presidentielle_path, commune_path)
+    snapshot_path = snapshot_path or election_for_path(presidentielle_path)['snapshot']
+    return snapshot_fingerprint(snapshot_path) or content_fingerprint(snapshot_path)
+
+
+@functools.lru_cache(maxsize=1)
+def _read_manifest(signature):
+    with open(signature[0], encoding='utf-8') as file:
+        manifest = json.load(file)
+    directory = os.path.dirname(signature[0])
+    return {
+        artifact['key']: os.path.join(directory, artifact['file'])
+        for election in manifest['elections'].values()
+        for artifact in election['artifacts'].values()
+    }
+
+
+def read_artifact(key, static_dir=STATIC_DIR):
+    """
+    Retourne le contenu (octets) du graphique ou de la carte précalculé dont la clé de cache est `key`,
+    ou None s'il n'existe pas. La clé contient l'empreinte des données et du code de rendu : un manifeste construit
+    sur d'autres données ou par une autre version du rendu ne correspond à aucune clé, et les graphiques sont alors calculés normalement.
+    """
+    manifest_path = os.path.join(static_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return None
+    path = _read_manifest(file_signature(manifest_path)).get(key)
+    if path is None or not os.path.exists(path):
+        return None
+    with open(path, 'rb') as file:
+        return file.read()
+
+
+def write_manifest(elections, static_dir=STATIC_DIR):
+    """
+    Écrit le manifeste des artefacts précalculés : {élection: {'fingerprint': ..., 'render_version': ..., 'artifacts': {nom: {'key', 'file'}}}}.
+    Les élections déjà présentes dans le manifeste et absentes de `elections` sont conservées.
+    Le fichier est remplacé en une seule opération, de sorte qu'un serveur en cours d'exécution ne lit jamais un manifeste partiel.
+    """
+    manifest_path = os.path.join(static_dir, MANIFEST_NAME)
+    merged = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as file:
+            merged = json.load(file)['elections']
+    merged.update(elections)
+
+    temporary_path = manifest_path + ".tmp"
+    with open(temporary_path, 'w', encoding='utf-8') as file:
+        json.dump({'elections': merged}, file, indent=2, ensure_ascii=False)
+    os.replace(temporary_path, manifest_path)
+    return manifest_path
@@ -1,232 +1,410 @@
 import streamlit as st
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import seaborn as sns
 import pandas as pd
 import folium
-from streamlit_folium import folium_static
-from folium.plugins import MarkerCluster
-from Pages.analysis import load_and_clean_data
+from Pages.snapshot import load_combined_data
+from Pages.registry import COMMUNE_PATH, DEFAULT_ELECTION, ELECTIONS
+from Pages.aggregation import load_cube, turnout
+from Pages.query import SIZE_BANDS, select
+from Pages.static_export import data_fingerprint
+from Pages.density import histogram_with_kde, scatter_or_density
+from Pages.chart_cache import chart_key, render_chart, render_map, render_version
+from Pages.metrics import measure
+from Pages.map_layers import (
+    format_popups, department_centroids, commune_marker_layer, department_circle_layer, commune_cluster_layer
+)
+
+
+# Dimensions des cartes (valeurs par défaut de folium_static)
+MAP_WIDTH = 700
+MAP_HEIGHT = 500
+
+# Graine de l'échantillonnage des communes de la première carte : la carte est identique à chaque rendu
+# (et à celle précalculée par build.py)
+MAP_SAMPLE_SEED = 0
+
+# Nombre de candidats sélectionnés par défaut (ceux ayant obtenu le plus de voix au niveau national)
+DEFAULT_CANDIDATE_COUNT = 4
+
+# Colonnes du DataFrame fusionné utilisées par cette page (seules ces colonnes sont lues depuis l'instantané)
+VISUALIZATION_COLUMNS = [
+    'Inscrits', 'Abstentions', 'Taux_participation', 'code_departement', 'nom_departement', 'nom_commune_complet', 'latitude', 'longitude'
+]
+
+
+def load_visualization_data(presidentielle_path):
+    """
+    Retourne les colonnes utiles du DataFrame fusionné de l'élection, lues depuis l'instantané
+    (ou depuis les fichiers sources s'il est périmé). La copie est partagée entre les sessions et ne doit pas être modifiée.
+    """
+    return load_combined_data(presidentielle_path, COMMUNE_PATH, columns=VISUALIZATION_COLUMNS)
+
+
+def build_candidate_votes_figure(cube, selected_candidates):
+    """
+    Graphique à barres du total national des voix des candidats sélectionnés.
+    """
+    # Total national des voix de chaque candidat sélectionné, lu dans le cube
+    voix_totales_filtered = [cube['national'].get(candidat, 0) for candidat in selected_candidates]
+
+    fig = Figure()
+    ax = fig.subplots()
+    # Création des barres pour chaque candidat avec une palette de couleurs unique
+    ax.bar(selected_candidates, voix_totales_filtered, color=sns.color_palette("husl", len(selected_candidates)))
+    ax.set_xlabel("Candidates")  # Étiquette de l'axe des x
+    ax.set_ylabel("Total Votes")  # Étiquette de l'axe des y
+    ax.set_title("Votes by Selected Candidates")  # Titre du graphique
+    plt.setp(ax.get_xticklabels(), rotation=45, ha='right')  # Rotation des étiquettes des x pour améliorer la lisibilité
+    return fig
+
+
+def build_turnout_histogram_figure(df):
+    """
+    Histogramme (20 classes et courbe de densité KDE) du taux de participation des communes.
+    Au-delà du seuil de DENSITY_POINT_THRESHOLD communes, l'histogramme et la KDE sont calculés sur des effectifs par classe.
+    """
+    fig = Figure()
+    ax = fig.subplots()
+    histogram_with_kde(ax, df['Taux_participation'], bins=20)
+    ax.set_title('Distribution of Voter Turnout')  # Titre du graphique
+    ax.set_xlabel('Voter Turnout (%)')  # Étiquette de l'axe des x
+    ax.set_ylabel('Number of Communes')  # Étiquette de l'axe des y
+    return fig
+
+
+def build_abstention_scatter_figure(df):
+    """
+    Nuage de points des inscrits (axe des x) et des abstentions (axe des y) de chaque commune.
+    Au-delà du seuil de DENSITY_POINT_THRESHOLD communes, une grille de densité remplace le nuage de points.
+    """
+    fig = Figure()
+    ax = fig.subplots()
+    # Limites des axes (0-10000 inscrits, 0-3000 abstentions), qui définissent aussi l'étendue de la grille de densité
+    scatter_or_density(ax, df["Inscrits"], df["Abstentions"], xlim=(0, 10000), ylim=(0, 3000), color='blue', s=10, alpha=0.6)
+    ax.set_xlabel("Registered Voters")  # Étiquette de l'axe des x
+    ax.set_ylabel("Abstentions")  # Étiquette de l'axe des y
+    ax.set_title("Registered Voters vs Abstentions (Moderate Zoom)")  # Titre du graphique
+    return fig
+
+
+def build_department_turnout_figure(cube):
+    """
+    Graphique à barres des 10 départements ayant le taux de participation le plus élevé.
+    """
+    # Taux de participation par département, calculé à partir des votants et inscrits sommés
+    df_participation_dep = cube['departement'][['code_departement', 'nom_departement']].assign(
+        Taux_participation=turnout(cube['departement'])
+    ).sort_values(by='Taux_participation', ascending=False).head(10)
+
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    sns.barplot(x='nom_departement', y='Taux_participation', data=df_participation_dep, ax=ax)
+    ax.set_title('Voter Turnout by Department')  # Titre du graphique
+    ax.set_xlabel('Department')  # Étiquette de l'axe des x
+    ax.set_ylabel('Voter Turnout (%)')  # Étiquette de l'axe des y
+    plt.setp(ax.get_xticklabels(), rotation=45, ha='right')  # Rotation des étiquettes pour améliorer la lisibilité
+    return fig
+
+
+def build_vote_types_figure(cube):
+    """
+    Diagramme circulaire des votes blancs, nuls et exprimés.
+    """
+    # Définitions des étiquettes et tailles pour les différentes catégories de votes
+    labels = ["Blank Votes", "Invalid Votes", "Casted Votes"]
+    sizes = [cube['national']["Blancs"], cube['national']["Nuls"], cube['national']["Exprimés"]]
+
+    fig = Figure()
+    ax = fig.subplots()
+    ax.pie(sizes, startangle=90, colors=['skyblue', 'lightcoral', 'lightgreen'], autopct=None)
+    total_votes = sum(sizes)  # Calcul du total des votes pour afficher les pourcentages
+    # Création des étiquettes pour la légende
+    legend_labels = [f"{label} - {size/total_votes*100:.1f}%" for label, size in zip(labels, sizes)]
+    ax.legend(legend_labels, loc="center left", bbox_to_anchor=(1, 0.5))  # Ajout de la légende
+    ax.axis('equal')  # Assurer que le diagramme est circulaire
+    ax.set_title("Votes", fontsize=14)  # Titre du graphique
+    return fig
+
+
+def top_departments(cube, n=10):
+    """
+    Retourne les `n` départements ayant le plus de voix (tous candidats), lus dans le cube.
+    """
+    return cube['departement'][['code_departement', 'nom_departement', 'Voix']].nlargest(n, 'Voix')
+
+
+def build_department_votes_figure(cube):
+    """
+    Graphique à barres des 10 départements ayant le plus de voix.
+    """
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    sns.barplot(x='code_departement', y='Voix', data=top_departments(cube), palette="Blues_d", ax=ax)
+    ax.set_title('Top Departments by Total Votes')  # Titre du graphique
+    ax.set_xlabel('Department Code')  # Étiquette de l'axe des x
+    ax.set_ylabel('Total Votes')  # Étiquette de l'axe des y
+    plt.setp(ax.get_xticklabels(), rotation=45, ha='right')  # Rotation des étiquettes des x
+    return fig
+
+
+def build_candidate_department_figure(cube, selected_candidates):
+    """
+    Graphique à barres comparant les voix des candidats sélectionnés dans les 20 départements ayant le plus de voix.
+    """
+    # Passage au format long (nom_departement, Nom, Voix) pour les seuls départements du top 20
+    top_20_dep = cube['departement'].nlargest(20, 'Voix')
+    df_candidat_dep_top20 = top_20_dep[['nom_departement'] + list(selected_candidates)].melt(
+        id_vars='nom_departement', var_name='Nom', value_name='Voix'
+    )
+
+    fig = Figure(figsize=(12, 8))
+    ax = fig.subplots()
+    sns.barplot(x='nom_departement', y='Voix', hue='Nom', data=df_candidat_dep_top20, ax=ax, palette="Set2")
+    ax.set_title("Votes by Candidate in the Top 20 Departments")  # Titre du graphique
+    ax.set_xlabel("Department")  # Étiquette de l'axe des x
+    ax.set_ylabel("Total Votes")  # Étiquette de l'axe des y
+    plt.setp(ax.get_xticklabels(), rotation=45, ha='right')  # Rotation des étiquettes des x pour améliorer la lisibilité
+    return fig
+
+
+def located_communes(df, cube):
+    """
+    Retourne les communes ayant des coordonnées géographiques, avec leur total des voix (tous candidats) issu du cube.
+    """
+    return df.assign(Voix=cube['commune']['Voix']).dropna(subset=['latitude', 'longitude'])
+
+
+def build_sampled_communes_map(df, cube):
+    """
+    Carte de 500 communes échantillonnées avec leur taux de participation et leur nombre d'inscrits.
+    """
+    # Nous sélectionnons un échantillon de 500 communes pour les afficher sur la carte afin de ne pas surcharger la carte
+    # (toutes les communes si les filtres en retiennent moins)
+    located = located_communes(df, cube)
+    sampled_communes = located.sample(n=min(500, len(located)), random_state=MAP_SAMPLE_SEED)
+
+    # Création d'une carte centrée sur la France avec un niveau de zoom initial de 6
+    commune_map = folium.Map(location=[46.603354, 1.888334], zoom_start=6)
+
+    # Ajout des marqueurs de l'échantillon en une seule couche construite à partir des colonnes
+    # Chaque marqueur affiche un popup avec le nom de la commune, le taux de participation et le nombre d'inscrits
+    popups = format_popups([
+        ("Commune", sampled_communes['nom_commune_complet'], None),
+        ("Voter turnout", sampled_communes['Taux_participation'], '%.2f%%'),
+        ("Registered voters", sampled_communes['Inscrits'], None),
+    ])
+    commune_marker_layer(sampled_communes['latitude'], sampled_communes['longitude'], popups).add_to(commune_map)
+    return commune_map
+
+
+def build_department_votes_map(df, cube):
+    """
+    Carte des 10 départements ayant le plus de voix, avec des cercles proportionnels au total des voix.
+    """
+    # Sélection des 10 départements ayant obtenu le plus de voix (totaux lus dans le cube)
+    top_10_departments = cube['departement'].nlargest(10, 'Voix')
+
+    # Création d'une carte centrée sur la France
+    departments_map = folium.Map(location=[46.603354, 1.888334], zoom_start=6)
+
+    # Facteur d'échelle utilisé pour ajuster la taille des cercles proportionnels en fonction du nombre total de voix
+    scaling_factor = 0.1  # Plus le facteur est grand, plus les cercles seront gros
+
+    # Ajout d'un cercle par département, centré sur le centre du département (table calculée en un seul groupby),
+    # avec une taille proportionnelle au nombre total de voix dans le département
+    popups = format_popups([
+        ("Department", top_10_departments['nom_departement'], None),
+        ("Total votes", top_10_departments['Voix'], None),
+    ])
+    department_circle_layer(
+        top_10_departments, department_centroids(located_communes(df, cube)), 'Voix', scaling_factor, popups
+    ).add_to(departments_map)
+    return departments_map
+
+
+def build_commune_cluster_map(df, cube):
+    """
+    Carte de toutes les communes, regroupées en clusters de marqueurs.
+    """
+    cleaned_commune_data = located_communes(df, cube)
+
+    # Création d'une carte interactive avec des clusters de marqueurs pour regrouper les communes proches
+    cluster_map = folium.Map(location=[46.603354, 1.888334], zoom_start=6)
+
+    # Ajout de toutes les communes en une seule couche de clusters construite à partir des colonnes :
+    # un popup affiche le nom de la commune et le nombre total de voix pour cette commune
+    popups = format_popups([
+        ("Commune", cleaned_commune_data['nom_commune_complet'], None),
+        ("Votes", cleaned_commune_data['Voix'], None),
+    ])
+    commune_cluster_layer(cleaned_commune_data['latitude'], cleaned_commune_data['longitude'], popups).add_to(cluster_map)
+    return cluster_map
+
+
+def ranked_candidates(cube):
+    """
+    Retourne les candidats du cube, du plus grand au plus petit nombre de voix au niveau national.
+    """
+    return cube['national'][cube['candidats']].sort_values(ascending=False).index.tolist()
+
+
+def chart_fingerprint(presidentielle_path, filters):
+    """
+    Empreinte des données (contenu des fichiers), du code de rendu et des filtres, utilisée comme clé du cache
+    des graphiques et des cartes et des graphiques précalculés par build.py.
+    """
+    return (data_fingerprint(presidentielle_path, COMMUNE_PATH), render_version(), sorted(filters.items()))
+
+
+def show_chart(fingerprint, name, build_figure, *args, **params):
+    """
+    Affiche un graphique depuis le cache des images ; la figure n'est construite que si les données
+    (empreinte) ou les paramètres ont changé.
+    """
+    with measure(f"chart.{name}"):
+        image = render_chart(chart_key(fingerprint, name, **params), build_figure, *args, **params)
+        st.image(image, width='stretch')
+
+
+def show_map(fingerprint, name, build_map, *args, **params):
+    """
+    Affiche une carte folium depuis le cache ; la carte n'est construite et convertie en HTML
+    que si les données (empreinte) ou les paramètres ont changé.
+    """
+    with measure(f"map.{name}"):
+        html = render_map(chart_key(fingerprint, name, **params), build_map, *args, **params)
+        st.iframe(html, height=MAP_HEIGHT + 10, width=MAP_WIDTH)
+
+
+def show_bar_charts(df, cube, fingerprint, selected_candidates):
+    """
+    Section des graphiques à barres : voix des candidats sélectionnés et voix par département.
+    """
+    # 1. Bar chart: Total Votes by Candidate (Selected Candidates)
+    st.title("Bar Chart - Total Votes for Selected Candidates")
+    show_chart(fingerprint, 'candidate_votes', build_candidate_votes_figure, cube, selected_candidates=selected_candidates)
+
+    # 6. Bar Chart: Votes by Department
+    st.title("Bar Chart - Votes by Department")
+    show_chart(fingerprint, 'department_votes', build_department_votes_figure, cube)
+
+    # 7. Display the top 10 departments
+    # Affichage textuel des 10 départements avec le plus de voix
+    st.markdown("### Top 10 Departments with the Most Votes")
+    for idx, row in enumerate(top_departments(cube).itertuples(), 1):
+        st.write(f"{idx}. {row.nom_departement} (Code: {row.code_departement}) - {row.Voix} votes")
+
+
+def show_turnout(df, cube, fingerprint, selected_candidates):
+    """
+    Section de la participation : distribution, inscrits et abstentions, participation par département et types de votes.
+    """
+    # 2. Histogram of Taux de Participation - General view of registered voters
+    st.title("Histogram - Distribution of Taux de Participation")
+    show_chart(fingerprint, 'turnout_histogram', build_turnout_histogram_figure, df)
+
+    # 3. Scatter plot: Registered voters vs Abstentions
+    st.title("Scatter Plot - Registered Voters vs Abstentions")
+    show_chart(fingerprint, 'abstention_scatter', build_abstention_scatter_figure, df)
+
+    # 4. Bar Chart: Voter Turnout by Department
+    st.title("Bar Chart - Voter Turnout by Department")
+    show_chart(fingerprint, 'department_turnout', build_department_turnout_figure, cube)
+
+    # 5. Pie chart: Blank, Null, and Valid Votes
+    st.title("Pie Chart - Votes")
+    show_chart(fingerprint, 'vote_types', build_vote_types_figure, cube)
+
+
+def show_maps(df, cube, fingerprint, selected_candidates):
+    """
+    Section des cartes interactives.
+    """
+    #First Map: Sampled Communes
+    st.title("Map of 500 Sampled Communes: Voter Turnout and Registered Voters 📍")
+    show_map(fingerprint, 'sampled_communes_map', build_sampled_communes_map, df, cube)
+
+    # Second Map: Total Votes by Department
+    st.title("Map 2: Total Votes by Department 📊")
+    show_map(fingerprint, 'department_votes_map', build_department_votes_map, df, cube)
+
+    # Third Map: Clustered Communes
+    st.title("Map 3: Clustered Communes 📍")
+    show_map(fingerprint, 'commune_cluster_map', build_commune_cluster_map, df, cube)
+
+
+def show_candidate_comparison(df, cube, fingerprint, selected_candidates):
+    """
+    Section de la comparaison des voix par candidat et par département.
+    """
+    # 8. Comparison of Votes by Candidate and Department (Top 20)
+    st.title("Comparison of Votes by Candidate and Department (Top 20)")
+    show_chart(fingerprint, 'candidate_department', build_candidate_department_figure, cube, selected_candidates=selected_candidates)
+
+
+# Sections de la page : seule la section choisie est calculée et affichée
+SECTIONS = {
+    "Bar Charts": show_bar_charts,
+    "Turnout": show_turnout,
+    "Maps": show_maps,
+    "Candidate Comparison": show_candidate_comparison,
+}
+
+
+def show_filters(presidentielle_path):
+    """
+    Affiche les filtres de la barre latérale (région, département, taille des communes, candidats).
+    Retourne les filtres des communes (dimension -> libellés retenus) et les candidats sélectionnés.
+    """
+    cube = load_cube(presidentielle_path, COMMUNE_PATH)
+    df_departement = cube['departement']
+
+    st.sidebar.header("Filters")
+    region_names = dict(zip(cube['region']['code_region'], cube['region']['nom_region']))
+    regions = st.sidebar.multiselect(
+        "Regions", sorted(region_names), format_func=lambda code: f"{region_names[code]} ({code})"
+    )
+
+    # Seuls les départements des régions retenues sont proposés
+    if regions:
+        df_departement = df_departement[df_departement['code_region'].isin(regions)]
+    department_names = dict(zip(df_departement['code_departement'], df_departement['nom_departement']))
+    departements = st.sidebar.multiselect(
+        "Departments", sorted(department_names), format_func=lambda code: f"{department_names[code]} ({code})"
+    )
+
+    bands = st.sidebar.multiselect("Commune size", list(SIZE_BANDS))
+
+    # Par défaut, les candidats ayant obtenu le plus de voix au niveau national
+    candidates = ranked_candidates(cube)
+    selected_candidates = st.sidebar.multiselect("Candidates", candidates, default=candidates[:DEFAULT_CANDIDATE_COUNT])
+
+    filters = {'region': tuple(regions), 'departement': tuple(departements), 'taille': tuple(bands)}
+    return filters, tuple(selected_candidates)
+
+
+def show_visualizations(election=DEFAULT_ELECTION):
+    st.title("Visualizations Page 📈")
 
+    # Chemin vers le fichier des résultats de l'élection choisie (registre des élections)
+    presidentielle_path = ELECTIONS[election]['path']
+    df = load_visualization_data(presidentielle_path)
+    filters, selected_candidates = show_filters(presidentielle_path)
 
-def load_data_if_needed():
-    # Cette fonction vérifie si les données sont déjà chargées dans la session
-    # Si ce n'est pas le cas, elle appelle la fonction `load_and_clean_data` pour charger les données
-    if 'df' not in st.session_state:
-        presidentielle_path = "./Presidentielle_2017_Resultats_Communes_Tour_1_c.xls"
-        commune_path = "./communes-departement-region.csv"
-        load_and_clean_data(presidentielle_path, commune_path)
+    # Empreinte des données et des filtres : clé du cache des graphiques et des graphiques précalculés
+    fingerprint = chart_fingerprint(presidentielle_path, filters)
 
+    st.write("Available columns in the DataFrame:")
+    st.write(df.columns)
 
-def show_visualizations():
-    st.title("Visualizations Page 📈")
+    # Choix de la section à afficher : les autres sections ne sont ni calculées ni rendues
+    section = st.radio("Section", list(SECTIONS), horizontal=True)
 
-    # Vérifie si les données sont chargées dans la session
-    if 'df' in st.session_state:
-        df = st.session_state['df']
-
-        st.write("Available columns in the DataFrame:")
-        st.write(df.columns)
-
-        # 1. Bar chart: Total Votes by Candidate (Selected Candidates)
-        st.title("Bar Chart - Total Votes for Selected Candidates")
-        # Liste des candidats que nous voulons visualiser
-        selected_candidates = ['LE PEN', 'MÉLENCHON', 'MACRON', 'FILLON']
-        # Filtrage du DataFrame pour ne garder que les lignes correspondantes à ces candidats
-        filtered_df = df[df['Nom'].isin(selected_candidates)]
-        # Calcul du total des voix pour chaque candidat sélectionné
-        voix_totales_filtered = [filtered_df[filtered_df['Nom'] == candidat]['Voix'].sum() for candidat in selected_candidates]
-
-        # Création du graphique à barres
-        fig1, ax1 = plt.subplots()
-        # Création des barres pour chaque candidat avec une palette de couleurs unique
-        ax1.bar(selected_candidates, voix_totales_filtered, color=sns.color_palette("husl", len(selected_candidates)))
-        ax1.set_xlabel("Candidates")  # Étiquette de l'axe des x
-        ax1.set_ylabel("Total Votes")  # Étiquette de l'axe des y
-        ax1.set_title("Votes by Selected Candidates")  # Titre du graphique
-        plt.xticks(rotation=45, ha='right')  # Rotation des étiquettes des x pour améliorer la lisibilité
-        st.pyplot(fig1)  # Affichage du graphique dans Streamlit
-
-        # 2. Histogram of Taux de Participation - General view of registered voters
-        st.title("Histogram - Distribution of Taux de Participation")
-        # Calcul du taux de participation en pourcentage pour chaque commune
-        df['Taux_participation'] = (df['Votants'] / df['Inscrits']) * 100
-        fig2, ax2 = plt.subplots()
-        # Création de l'histogramme avec des 20 bins et une courbe de densité KDE
-        sns.histplot(df['Taux_participation'], bins=20, kde=True, ax=ax2)
-        ax2.set_title('Distribution of Voter Turnout')  # Titre du graphique
-        ax2.set_xlabel('Voter Turnout (%)')  # Étiquette de l'axe des x
-        ax2.set_ylabel('Number of Communes')  # Étiquette de l'axe des y
-        st.pyplot(fig2)
-
-        # 3. Scatter plot: Registered voters vs Abstentions
-        st.title("Scatter Plot - Registered Voters vs Abstentions")
-        fig3, ax3 = plt.subplots()
-        # Création d'un nuage de points avec les "Inscrits" sur l'axe des x et "Abstentions" sur l'axe des y
-        ax3.scatter(df["Inscrits"], df["Abstentions"], color='blue', s=10, alpha=0.6)
-        ax3.set_xlabel("Registered Voters")  # Étiquette de l'axe des x
-        ax3.set_ylabel("Abstentions")  # Étiquette de l'axe des y
-        ax3.set_title("Registered Voters vs Abstentions (Moderate Zoom)")  # Titre du graphique
-        ax3.set_xlim(0, 10000)  # Limite de l'axe des x
-        ax3.set_ylim(0, 3000)  # Limite de l'axe des y
-        st.pyplot(fig3)
-
-        # 4. Bar Chart: Voter Turnout by Department
-        st.title("Bar Chart - Voter Turnout by Department")
-        # Calcul du taux moyen de participation par département
-        df_participation_dep = df.groupby(['code_departement', 'nom_departement'], as_index=False).agg({
-            'Taux_participation': 'mean'
-        }).sort_values(by='Taux_participation', ascending=False).head(10)
-
-        fig4, ax4 = plt.subplots(figsize=(10, 6))
-        # Création du graphique à barres avec les 10 départements ayant le taux de participation moyen le plus élevé
-        sns.barplot(x='nom_departement', y='Taux_participation', data=df_participation_dep, ax=ax4)
-        ax4.set_title('Voter Turnout by Department')  # Titre du graphique
-        ax4.set_xlabel('Department')  # Étiquette de l'axe des x
-        ax4.set_ylabel('Voter Turnout (%)')  # Étiquette de l'axe des y
-        plt.xticks(rotation=45, ha='right')  # Rotation des étiquettes pour améliorer la lisibilité
-        st.pyplot(fig4)
-
-        # 5. Pie chart: Blank, Null, and Valid Votes
-        st.title("Pie Chart - Votes")
-        # Définitions des étiquettes et tailles pour les différentes catégories de votes
-        labels = ["Blank Votes", "Invalid Votes", "Casted Votes"]
-        sizes = [df["Blancs"].sum(), df["Nuls"].sum(), df["Exprimés"].sum()]
-
-        fig5, ax5 = plt.subplots()
-        # Création du diagramme circulaire (pie chart) avec les tailles des catégories de votes
-        ax5.pie(sizes, startangle=90, colors=['skyblue', 'lightcoral', 'lightgreen'], autopct=None)
-        total_votes = sum(sizes)  # Calcul du total des votes pour afficher les pourcentages
-        # Création des étiquettes pour la légende
-        legend_labels = [f"{label} - {size/total_votes*100:.1f}%" for label, size in zip(labels, sizes)]
-        ax5.legend(legend_labels, loc="center left", bbox_to_anchor=(1, 0.5))  # Ajout de la légende
-        ax5.axis('equal')  # Assurer que le diagramme est circulaire
-        ax5.set_title("Votes", fontsize=14)  # Titre du graphique
-        st.pyplot(fig5)
-
-        # 6. Bar Chart: Votes by Department
-        st.title("Bar Chart - Votes by Department")
-        # Calcul du total des voix par département et tri décroissant par nombre de voix
-        df_dep = df.groupby(['code_departement', 'nom_departement'], as_index=False).agg({'Voix': 'sum'}).sort_values(by='Voix', ascending=False)
-
-        # Sélection des 10 départements avec le plus de voix
-        top_10_dep = df_dep.head(10)
-
-        fig6, ax6 = plt.subplots(figsize=(10, 6))
-        # Création du graphique à barres pour les 10 départements ayant le plus de voix
-        sns.barplot(x='code_departement', y='Voix', data=top_10_dep, palette="Blues_d", ax=ax6)
-        ax6.set_title('Top Departments by Total Votes')  # Titre du graphique
-        ax6.set_xlabel('Department Code')  # Étiquette de l'axe des x
-        ax6.set_ylabel('Total Votes')  # Étiquette de l'axe des y
-        plt.xticks(rotation=45, ha='right')  # Rotation des étiquettes des x
-        st.pyplot(fig6)
-
-        # 7. Display the top 10 departments
-        # Affichage textuel des 10 départements avec le plus de voix
-        st.markdown("### Top 10 Departments with the Most Votes")
-        for idx, row in enumerate(top_10_dep.itertuples(), 1):
-            st.write(f"{idx}. {row.nom_departement} (Code: {row.code_departement}) - {row.Voix} votes")
-
-        # 8. Comparison of Votes by Candidate and Department (Top 20)
-        st.title("Comparison of Votes by Candidate and Department (Top 20)")
-        # Agrégation des voix par département et par candidat
-        df_candidat_dep = df.groupby(['nom_departement', 'Nom']).agg({'Voix': 'sum'}).reset_index()
-
-        # Calcul du total des voix par département et sélection des 20 départements ayant le plus de voix
-        total_voix_dep = df.groupby('nom_departement').agg({'Voix': 'sum'}).reset_index()
-        top_20_dep = total_voix_dep.sort_values(by='Voix', ascending=False).head(20)['nom_departement']
-
-        # Filtrage des données pour ne garder que les départements du top 20
-        df_candidat_dep_top20 = df_candidat_dep[df_candidat_dep['nom_departement'].isin(top_20_dep)]
-
-        fig7, ax7 = plt.subplots(figsize=(12, 8))
-        # Création d'un graphique à barres empilées comparant les voix par candidat dans le top 20 des départements
-        sns.barplot(x='nom_departement', y='Voix', hue='Nom', data=df_candidat_dep_top20, ax=ax7, palette="Set2")
-
-        ax7.set_title("Votes by Candidate in the Top 20 Departments")  # Titre du graphique
-        ax7.set_xlabel("Department")  # Étiquette de l'axe des x
-        ax7.set_ylabel("Total Votes")  # Étiquette de l'axe des y
-        plt.xticks(rotation=45, ha='right')  # Rotation des étiquettes des x pour améliorer la lisibilité
-        st.pyplot(fig7)
-
-        #First Map: Sampled Communes
-        st.title("Map of 500 Sampled Communes: Voter Turnout and Registered Voters 📍")
-
-        # Nettoyage des données pour retirer les communes sans coordonnées géographiques (latitude et longitude)
-        cleaned_commune_data = df.dropna(subset=['latitude', 'longitude'])
-
-        # Nous sélectionnons un échantillon de 500 communes pour les afficher sur la carte afin de ne pas surcharger la carte
-        sampled_communes = cleaned_commune_data.sample(n=500)
-
-        # Création d'une carte centrée sur la France avec un niveau de zoom initial de 6
-        commune_map = folium.Map(location=[46.603354, 1.888334], zoom_start=6)
-
-        # Boucle à travers chaque commune de l'échantillon pour ajouter des marqueurs à la carte
-        for index, row in sampled_communes.iterrows():
-            # Utilisation des coordonnées de la commune (latitude, longitude) pour placer un marqueur sur la carte
-            # Chaque marqueur affiche un popup avec le nom de la commune, le taux de participation et le nombre d'inscrits
-            folium.Marker(
-                location=[row['latitude'], row['longitude']],  # Localisation de la commune sur la carte
-                popup=f"Commune: {row['nom_commune_complet']}<br>Voter turnout: {row['Taux_participation']:.2f}%<br>Registered voters: {row['Inscrits']}",
-                icon=folium.Icon(color='blue', icon='info-sign')  # Style du marqueur (bleu avec une icône d'information)
-            ).add_to(commune_map)  # Ajout du marqueur à la carte
-
-        # Affichage de la carte interactive avec les communes échantillonnées dans Streamlit
-        folium_static(commune_map)
-
-        # Second Map: Total Votes by Department
-        st.title("Map 2: Total Votes by Department 📊")
-
-        # Calcul du total des voix pour chaque département et regroupement des données par code de département et nom de département
-        df_voix_par_departement = cleaned_commune_data.groupby(['code_departement', 'nom_departement']).agg({'Voix': 'sum'}).reset_index()
-
-        # Sélection des 10 départements ayant obtenu le plus de voix
-        top_10_departments = df_voix_par_departement.nlargest(10, 'Voix')
-
-        # Création d'une carte centrée sur la France
-        departments_map = folium.Map(location=[46.603354, 1.888334], zoom_start=6)
-
-        # Facteur d'échelle utilisé pour ajuster la taille des cercles proportionnels en fonction du nombre total de voix
-        scaling_factor = 0.1  # Plus le facteur est grand, plus les cercles seront gros
-
-        # Boucle à travers les 10 départements ayant obtenu le plus de voix
-        for index, row in top_10_departments.iterrows():
-            # Sélection d'une commune représentative du département pour utiliser ses coordonnées comme centre du cercle
-            commune_in_dept = cleaned_commune_data[cleaned_commune_data['code_departement'] == row['code_departement']].iloc[0]
-
-            # Ajout d'un cercle sur la carte, avec une taille proportionnelle au nombre total de voix dans le département
-            folium.Circle(
-                location=[commune_in_dept['latitude'], commune_in_dept['longitude']],  # Localisation centrale du département
-                radius=row['Voix'] * scaling_factor,  # Taille du cercle proportionnelle au nombre total de voix
-                color='crimson',  # Couleur du cercle
-                fill=True,  # Le cercle est rempli de couleur
-                fill_opacity=0.6,  # Opacité du remplissage (0 = transparent, 1 = opaque)
-                popup=f"Department: {row['nom_departement']}<br>Total votes: {row['Voix']}"  # Informations affichées au survol
-            ).add_to(departments_map)  # Ajout du cercle à la carte
-
-        # Affichage de la carte interactive avec les cercles proportionnels dans Streamlit
-        folium_static(departments_map)
-
-        # Third Map: Clustered Communes
-        st.title("Map 3: Clustered Communes 📍")
-
-        # Création d'une carte interactive avec des clusters de marqueurs pour regrouper les communes proches
-        cluster_map = folium.Map(location=[46.603354, 1.888334], zoom_start=6)
-
-        # Ajout d'une fonctionnalité de cluster de marqueurs avec Folium
-        marker_cluster = MarkerCluster().add_to(cluster_map)
-
-        # Boucle à travers chaque commune (après nettoyage) pour ajouter des marqueurs aux clusters
-        for index, row in cleaned_commune_data.iterrows():
-            # Chaque commune est ajoutée avec ses coordonnées géographiques (latitude et longitude)
-            # Un popup affiche le nom de la commune et le nombre total de voix pour cette commune
-            folium.Marker(
-                location=[row['latitude'], row['longitude']],  # Localisation de la commune
-                popup=f"Commune: {row['nom_commune_complet']}<br>Votes: {row['Voix']}"  # Informations supplémentaires dans le popup
-            ).add_to(marker_cluster)  # Ajout du marqueur au cluster
-
-        # Affichage de la carte avec les clusters de communes dans Streamlit
-        folium_static(cluster_map)
-
-    else:
-        # Message d'erreur si les données ne sont pas encore chargées
-        st.error("The DataFrame has not been loaded yet. Please load the data in the 'Analysis' tab first.")
+    # Restriction des données aux communes retenues par les filtres (index précalculés, sans copie du DataFrame complet)
+    df_view, cube_view = select(presidentielle_path, COMMUNE_PATH, df, filters)
+    if df_view.empty:
+        st.warning("No commune matches the selected filters.")
+        return
+    SECTIONS[section](df_view, cube_view, fingerprint, selected_candidates)
@@ -0,0 +1,267 @@
+"""
+Banc d'essai du pipeline de données et des graphiques, sans Streamlit.
+
+Chaque étape (lecture du classeur des résultats et du fichier des communes, nettoyage, fusion, agrégation, filtrage,
+construction des graphiques et des cartes) est exécutée sur des jeux de données synthétiques de taille croissante ;
+sa durée et son pic de mémoire sont mesurés.
+
+    python benchmark.py                          # 10 000, 100 000 et 1 000 000 communes
+    python benchmark.py --rows 10000 --no-maps --json benchmark.json
+    python benchmark.py --rows 10000 --no-workbook   # sans la lecture du classeur (la plus longue)
+"""
+import argparse
+import gc
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+import openpyxl
+import matplotlib
+matplotlib.use('Agg')
+
+from Pages.registry import ELECTIONS, DEFAULT_ELECTION
+from Pages.ingestion import clean_presidentielle, merge_communes, parse_presidentielle_workbook, stream_commune_index
+from Pages.candidates import build_candidate_table
+from Pages.aggregation import build_cube, rollup
+from Pages.query import build_query_index, resolve_positions
+from Pages.chart_cache import figure_to_bytes, map_to_html
+from Pages.visualization import (
+    VISUALIZATION_COLUMNS, build_candidate_votes_figure, build_turnout_histogram_figure, build_abstention_scatter_figure,
+    build_department_turnout_figure, build_vote_types_figure, build_department_votes_figure,
+    build_candidate_department_figure, build_sampled_communes_map, build_department_votes_map, build_commune_cluster_map
+)
+
+# Tailles des jeux de données synthétiques (nombre de communes)
+DEFAULT_ROWS = [10_000, 100_000, 1_000_000]
+
+# En-tête du fichier des résultats (avant les blocs des candidats)
+BASE_COLUMNS = [
+    'Code du département', 'Libellé du département', 'Code de la commune', 'Libellé de la commune',
+    'Inscrits', 'Abstentions', '% Abs/Ins', 'Votants', '% Vot/Ins', 'Blancs', '% Blancs/Ins', '% Blancs/Vot',
+    'Nuls', '% Nuls/Ins', '% Nuls/Vot', 'Exprimés', '% Exp/Ins', '% Exp/Vot'
+]
+
+# Départements et régions synthétiques (codes sur 2 caractères, 13 régions)
+N_DEPARTMENTS = 96
+N_REGIONS = 13
+
+# Nombre maximal de lignes d'une feuille .xlsx
+XLSX_MAX_ROWS = 1_048_576
+
+
+def synthetic_dataset(n_rows, election=ELECTIONS[DEFAULT_ELECTION], seed=0):
+    """
+    Retourne un DataFrame des résultats au format du classeur (en-tête appliqué) et un DataFrame des communes
+    au format du fichier CSV (environ 1,2 ligne par commune, comme les communes à plusieurs codes postaux).
+    """
+    rng = np.random.default_rng(seed)
+    n_candidates = election['candidate_slots']
+
+    departments = np.array([str(i).zfill(2) for i in range(1, N_DEPARTMENTS + 1)], dtype=object)
+    department_ids = np.arange(n_rows) % N_DEPARTMENTS
+    commune_numbers = np.arange(n_rows) // N_DEPARTMENTS + 1
+    codes_commune = pd.Series(commune_numbers).astype(str).str.zfill(3).to_numpy(dtype=object)
+
+    inscrits = rng.integers(50, 20000, n_rows)
+    votants = (inscrits * rng.uniform(0.6, 0.9, n_rows)).astype(np.int64)
+    blancs = votants // 100
+    nuls = votants // 200
+    exprimes = votants - blancs - nuls
+    votes = np.floor(rng.dirichlet(np.ones(n_candidates), n_rows) * exprimes[:, None]).astype(np.int64)
+
+    columns = {
+        'Code du département': departments[department_ids],
+        'Libellé du département': np.char.add('Département ', departments[department_ids].astype(str)).astype(object),
+        'Code de la commune': commune_numbers,
+        'Libellé de la commune': np.char.add('Commune ', codes_commune.astype(str)).astype(object),
+        'Inscrits': inscrits, 'Abstentions': inscrits - votants, 'Votants': votants,
+        'Blancs': blancs, 'Nuls': nuls, 'Exprimés': exprimes,
+    }
+    data = {column: columns.get(column, np.zeros(n_rows)) for column in BASE_COLUMNS}
+    for i in range(n_candidates):
+        suffix = '' if i == 0 else f'.{i}'
+        block = {
+            'N°Panneau': np.full(n_rows, i + 1), 'Sexe': np.full(n_rows, 'M', dtype=object),
+            'Nom': np.full(n_rows, f'CANDIDAT {i + 1}', dtype=object), 'Prénom': np.full(n_rows, 'Prénom', dtype=object),
+            'Voix': votes[:, i], '% Voix/Ins': np.zeros(n_rows), '% Voix/Exp': np.zeros(n_rows),
+        }
+        data.update({f'{column}{suffix}': values for column, values in block.items()})
+    df_presidentielle = pd.DataFrame(data)
+
+    # Fichier des communes : une ligne par commune, plus une ligne supplémentaire (autre code postal) pour une commune sur cinq
+    rows = np.concatenate([np.arange(n_rows), np.arange(0, n_rows, 5)])
+    insee = np.char.add(departments[department_ids[rows]].astype(str), codes_commune[rows].astype(str)).astype(object)
+    region_ids = department_ids[rows] % N_REGIONS
+    df_communes = pd.DataFrame({
+        'code_commune_INSEE': insee,
+        'nom_commune_postal': insee,
+        'code_postal': insee,
+        'latitude': rng.uniform(42.3, 51.1, len(rows)),
+        'longitude': rng.uniform(-4.8, 8.2, len(rows)),
+        'code_commune': codes_commune[rows],
+        'nom_commune_complet': np.char.add('Commune ', insee.astype(str)).astype(object),
+        'code_departement': departments[department_ids[rows]],
+        'nom_departement': np.char.add('Département ', departments[department_ids[rows]].astype(str)).astype(object),
+        'code_region': region_ids + 1,
+        'nom_region': np.char.add('Région ', (region_ids + 1).astype(str)).astype(object),
+    })
+    return df_presidentielle, df_communes
+
+
+def write_workbook(df_presidentielle, path, election):
+    """
+    Écrit les résultats synthétiques dans un classeur .xlsx disposé comme le fichier officiel : un titre,
+    puis la ligne d'en-tête après `skiprows` lignes. Les lignes sont écrites une à une (mode write_only),
+    de sorte que la mémoire nécessaire ne dépend pas de la taille du jeu de données.
+    """
+    skiprows = election['skiprows']
+    if len(df_presidentielle) + skiprows + 1 > XLSX_MAX_ROWS:
+        raise ValueError(f"{len(df_presidentielle)} communes dépassent la taille d'une feuille .xlsx (utiliser --no-workbook)")
+
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    for i in range(skiprows):
+        sheet.append([election['label']] if i == 0 else [])
+    sheet.append(list(df_presidentielle.columns))
+    for row in df_presidentielle.itertuples(index=False, name=None):
+        sheet.append(row)
+    workbook.save(path)
+
+
+def run_stage(stage, function, *args, memory=True):
+    """
+    Exécute une étape une première fois pour mesurer sa durée, puis une seconde fois sous tracemalloc
+    pour mesurer son pic de mémoire (tracemalloc ralentit les allocations et fausserait la durée).
+    Retourne le résultat de l'étape et sa mesure.
+    """
+    gc.collect()
+    start = time.perf_counter()
+    result = function(*args)
+    seconds = time.perf_counter() - start
+
+    peak = np.nan
+    if memory:
+        del result
+        gc.collect()
+        tracemalloc.start()
+        try:
+            result = function(*args)
+            peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+    return result, {'stage': stage, 'seconds': seconds, 'peak memory (MB)': peak}
+
+
+def benchmark(n_rows, maps=True, memory=True, workbook=True, seed=0):
+    """
+    Mesure chaque étape du pipeline sur un jeu de données synthétique de `n_rows` communes.
+    Avec `workbook`, les résultats sont d'abord écrits dans un classeur .xlsx, dont la lecture est mesurée
+    et dont le contenu alimente les étapes suivantes.
+    Retourne la liste des mesures (une par étape).
+    """
+    election = ELECTIONS[DEFAULT_ELECTION]
+    df_presidentielle, df_communes = synthetic_dataset(n_rows, election, seed)
+    measures = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        if workbook:
+            # Classeur .xlsx lu avec openpyxl (le format .xls de 2017 ne peut pas être écrit), avec la disposition de l'élection
+            results_path = os.path.join(directory, 'resultats.xlsx')
+            write_workbook(df_presidentielle, results_path, election)
+            del df_presidentielle
+            (_, df_presidentielle), measure = run_stage(
+                'load.results', parse_presidentielle_workbook, results_path, election['skiprows'], 'openpyxl', memory=memory
+            )
+            measures.append(measure)
+
+        commune_path = os.path.join(directory, 'communes.csv')
+        df_communes.to_csv(commune_path, index=False)
+        del df_communes
+        commune_index, measure = run_stage('load.communes', stream_commune_index, commune_path, memory=memory)
+        measures.append(measure)
+
+    stages = [
+        ('clean', lambda: clean_presidentielle(df_presidentielle, election)),
+        ('merge', lambda: merge_communes(results['clean'], commune_index)),
+        ('candidates', lambda: build_candidate_table(results['merge'])),
+        ('aggregate', lambda: build_cube(results['merge'], *results['candidates'])),
+        ('query.index', lambda: build_query_index(results['aggregate']['commune'])),
+        ('query.filter', lambda: filter_cube(results['aggregate'], results['query.index'])),
+    ]
+    results = {}
+    for stage, function in stages:
+        results[stage], measure = run_stage(stage, function, memory=memory)
+        measures.append(measure)
+
+    df = results['merge'][VISUALIZATION_COLUMNS]
+    cube = results['aggregate']
+    selected_candidates = tuple(cube['national'][cube['candidats']].nlargest(4).index)
+    figures = [
+        ('candidate_votes', build_candidate_votes_figure, (cube, selected_candidates)),
+        ('turnout_histogram', build_turnout_histogram_figure, (df,)),
+        ('abstention_scatter', build_abstention_scatter_figure, (df,)),
+        ('department_turnout', build_department_turnout_figure, (cube,)),
+        ('vote_types', build_vote_types_figure, (cube,)),
+        ('department_votes', build_department_votes_figure, (cube,)),
+        ('candidate_department', build_candidate_department_figure, (cube, selected_candidates)),
+    ]
+    for name, build_figure, args in figures:
+        _, measure = run_stage(f'chart.{name}', lambda: figure_to_bytes(build_figure(*args)), memory=memory)
+        measures.append(measure)
+
+    if maps:
+        for name, build_map in [
+            ('sampled_communes_map', build_sampled_communes_map),
+            ('department_votes_map', build_department_votes_map),
+            ('commune_cluster_map', build_commune_cluster_map),
+        ]:
+            _, measure = run_stage(f'map.{name}', lambda: map_to_html(build_map(df, cube)), memory=memory)
+            measures.append(measure)
+
+    for measure in measures:
+        measure['rows'] = n_rows
+    return measures
+
+
+def filter_cube(cube, index):
+    """
+    Filtre représentatif de la barre latérale : une région et deux tranches de taille, puis recalcul des agrégats.
+    """
+    filters = {
+        'region': tuple(index['region']['labels'][:1]),
+        'departement': (),
+        'taille': tuple(index['taille']['labels'][:2]),
+    }
+    positions = resolve_positions(index, filters)
+    return rollup(cube['commune'].iloc[positions], cube['candidats'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc d'essai du pipeline de données et des graphiques.")
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS, help="nombre de communes de chaque jeu de données")
+    parser.add_argument('--no-maps', action='store_true', help="ne pas mesurer la construction des cartes folium")
+    parser.add_argument('--no-memory', action='store_true', help="ne pas mesurer le pic de mémoire (une seule exécution par étape)")
+    parser.add_argument('--no-workbook', action='store_true', help="ne pas mesurer la lecture du classeur des résultats")
+    parser.add_argument('--json', help="fichier où écrire les mesures au format JSON")
+    args = parser.parse_args()
+
+    measures = []
+    for n_rows in args.rows:
+        measures += benchmark(n_rows, maps=not args.no_maps, memory=not args.no_memory, workbook=not args.no_workbook)
+
+    report = pd.DataFrame(measures).pivot(index='stage', columns='rows')
+    report = report.reindex(pd.unique(pd.Series([measure['stage'] for measure in measures])))
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(report.round(3))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump(measures, file, indent=2, default=float)
+        print(f"Mesures écrites dans {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Mode de construction statique : calcule une fois toutes les données, puis enregistre chaque graphique (PNG)
+et chaque carte (HTML) de la page Visualizations, ainsi qu'un manifeste qui les décrit.
+
+    python build.py                        # toutes les élections dont les fichiers sources sont présents
+    python build.py --elections 2017-T1 --output ./static
+
+Tant que les données et le code de rendu ne changent pas (même empreinte de contenu, même RENDER_VERSION),
+l'application sert ces fichiers au lieu de recalculer les graphiques ; sinon, elle revient au calcul habituel.
+"""
+import argparse
+import os
+import matplotlib
+matplotlib.use('Agg')
+
+from Pages.registry import COMMUNE_PATH, ELECTIONS
+from Pages.aggregation import load_cube
+from Pages.chart_cache import RENDER_VERSION, chart_key, figure_to_bytes, map_to_html
+from Pages.query import FILTER_DIMENSIONS
+from Pages.static_export import STATIC_DIR, data_fingerprint, write_manifest
+from Pages.visualization import (
+    DEFAULT_CANDIDATE_COUNT, build_candidate_votes_figure, build_turnout_histogram_figure, build_abstention_scatter_figure,
+    build_department_turnout_figure, build_vote_types_figure, build_department_votes_figure,
+    build_candidate_department_figure, build_sampled_communes_map, build_department_votes_map, build_commune_cluster_map,
+    chart_fingerprint, load_visualization_data, ranked_candidates
+)
+
+
+def build_election(key, static_dir=STATIC_DIR):
+    """
+    Construit les graphiques et cartes d'une élection, tels qu'affichés sans filtre et avec les candidats par défaut.
+    Retourne l'entrée du manifeste : {'fingerprint': ..., 'render_version': ..., 'artifacts': {nom: {'key': clé de cache, 'file': chemin relatif}}}.
+    """
+    presidentielle_path = ELECTIONS[key]['path']
+    df = load_visualization_data(presidentielle_path)
+    cube = load_cube(presidentielle_path, COMMUNE_PATH)
+    selected_candidates = tuple(ranked_candidates(cube)[:DEFAULT_CANDIDATE_COUNT])
+    fingerprint = chart_fingerprint(presidentielle_path, {dimension: () for dimension in FILTER_DIMENSIONS})
+
+    # Mêmes noms, arguments et paramètres que les appels de show_chart / show_map des sections de la page
+    charts = [
+        ('candidate_votes', build_candidate_votes_figure, (cube,), {'selected_candidates': selected_candidates}),
+        ('department_votes', build_department_votes_figure, (cube,), {}),
+        ('turnout_histogram', build_turnout_histogram_figure, (df,), {}),
+        ('abstention_scatter', build_abstention_scatter_figure, (df,), {}),
+        ('department_turnout', build_department_turnout_figure, (cube,), {}),
+        ('vote_types', build_vote_types_figure, (cube,), {}),
+        ('candidate_department', build_candidate_department_figure, (cube,), {'selected_candidates': selected_candidates}),
+    ]
+    maps = [
+        ('sampled_communes_map', build_sampled_communes_map),
+        ('department_votes_map', build_department_votes_map),
+        ('commune_cluster_map', build_commune_cluster_map),
+    ]
+
+    os.makedirs(os.path.join(static_dir, key), exist_ok=True)
+    artifacts = {}
+
+    def save(name, extension, content, params):
+        # Écriture dans un fichier temporaire puis renommage : un serveur en cours d'exécution ne lit jamais un fichier partiel
+        relative_path = f"{key}/{name}.{extension}"
+        path = os.path.join(static_dir, relative_path)
+        temporary_path = path + ".tmp"
+        with open(temporary_path, 'wb') as file:
+            file.write(content)
+        os.replace(temporary_path, path)
+        artifacts[name] = {'key': chart_key(fingerprint, name, **params), 'file': relative_path}
+
+    for name, build_figure, args, params in charts:
+        save(name, 'png', figure_to_bytes(build_figure(*args, **params)), params)
+    for name, build_map in maps:
+        save(name, 'html', map_to_html(build_map(df, cube)).encode('utf-8'), {})
+
+    return {
+        'label': ELECTIONS[key]['label'],
+        'fingerprint': data_fingerprint(presidentielle_path, COMMUNE_PATH),
+        'render_version': RENDER_VERSION,
+        'artifacts': artifacts,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Précalcule les graphiques et cartes de la page Visualizations.")
+    parser.add_argument('--elections', nargs='+', choices=list(ELECTIONS), help="élections à construire (par défaut : celles dont les fichiers sont présents)")
+    parser.add_argument('--output', default=STATIC_DIR, help="dossier des fichiers générés et du manifeste")
+    args = parser.parse_args()
+
+    keys = args.elections or [
+        key for key, election in ELECTIONS.items() if os.path.exists(election['path']) and os.path.exists(COMMUNE_PATH)
+    ]
+    elections = {}
+    for key in keys:
+        elections[key] = build_election(key, args.output)
+        print(f"{ELECTIONS[key]['label']} : {len(elections[key]['artifacts'])} fichiers écrits dans {args.output}/{key}")
+    print(f"Manifeste écrit dans {write_manifest(elections, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,8 @@ import streamlit as st
 from Pages.introduction import show_introduction
 from Pages.analysis import show_analysis
 from Pages.visualization import show_visualizations
+from Pages.registry import ELECTIONS, DEFAULT_ELECTION, available_elections
+from Pages.metrics import metrics_json, metrics_summary
 
 # Sidebar function (kept common across all pages)
 def show_sidebar():
@@ -42,19 +44,38 @@ def show_sidebar():
     with col4:
         st.markdown("<div style='line-height: 3;'><a href='https://www.linkedin.com/in/willy-du-377037222/' target='_blank'><strong>LinkedIn</strong></a></div>", unsafe_allow_html=True)
 
+    # Panneau des mesures de performance, rempli une fois la page affichée (voir show_metrics)
+    return st.sidebar.expander("Performance ⏱️")
+
+# Performance panel: per-stage latency percentiles and memory of this process
+def show_metrics(panel):
+    with panel:
+        summary = metrics_summary()
+        if summary.empty:
+            st.write("No measurements yet.")
+            return
+        st.dataframe(summary)
+        st.download_button("Download metrics (JSON)", metrics_json(), file_name="metrics.json", mime="application/json")
+
 # Main function for page navigation
 def main():
     st.sidebar.title("Navigation")
     page = st.sidebar.selectbox("Choose a Page:", ["Introduction", "Analysis", "Visualizations"])
+    # Choix de l'élection parmi celles dont les données sont présentes
+    election = st.sidebar.selectbox(
+        "Choose an Election:", available_elections() or [DEFAULT_ELECTION], format_func=lambda key: ELECTIONS[key]['label']
+    )
 
-    show_sidebar()
+    metrics_panel = show_sidebar()
 
     if page == "Introduction":
         show_introduction()
     elif page == "Analysis":
-        show_analysis()
+        show_analysis(election)
     elif page == "Visualizations":
-        show_visualizations()
+        show_visualizations(election)
+
+    show_metrics(metrics_panel)
 
 if __name__ == "__main__":
     main()